@@ -1,9 +1,25 @@
 import os
-import json
-import csv
+import asyncio
+import atexit
+import hashlib
+import io
+import mmap
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from array import array
+from functools import lru_cache, partial
+from itertools import chain, groupby, islice
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
+import orjson
+import pandas as pd
 from dotenv import load_dotenv
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 from langchain_mistralai import MistralAIEmbeddings, ChatMistralAI
 from langchain_qdrant import QdrantVectorStore
@@ -13,11 +29,27 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from qdrant_client import QdrantClient
-
-from pypdf import PdfReader
-from hybrid_rag import HybridRAG, QueryExamples
+from qdrant_client.models import (
+    Distance,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    VectorParams,
+)
+from semantic_text_splitter import TextSplitter
+from neo4j import GraphDatabase
+
+import fitz
+from hybrid_rag import HybridRAG, QueryExamples, classify_domain
 from dashboard import render_dashboard
 from pixtral_processor import PixtralPDFProcessor
+from neo4j_loader import Neo4jLoader
+from neo4j_query import NEO4J_DRIVER_OPTIONS
 
 # Configuration
 load_dotenv()
@@ -25,51 +57,135 @@ load_dotenv()
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 QDRANT_ENDPOINT = os.getenv("QDRANT_ENDPOINT")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+# Délai explicite (s): les uploads volumineux dépassent le délai par défaut du client
+QDRANT_TIMEOUT = 30
 COLLECTION_NAME = "documents_rag"
-
-# Fonctions de chargement (identiques à app.py)
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "0"))
+# "rust" (semantic-text-splitter) ou "langchain" (RecursiveCharacterTextSplitter, pour comparaison)
+SPLITTER_BACKEND = os.getenv("SPLITTER_BACKEND", "rust")
+EMBED_BATCH_SIZE = 64
+EMBED_CONCURRENCY = 10
+# Chunks embeddés et uploadés par lot: la mémoire reste O(lot) et non O(corpus)
+INGEST_BATCH_SIZE = EMBED_BATCH_SIZE * EMBED_CONCURRENCY
+# Upload Qdrant: petites requêtes (32-64 points) envoyées par plusieurs workers
+QDRANT_UPLOAD_BATCH_SIZE = 64
+QDRANT_UPLOAD_PARALLEL = 8
+PDF_PAGE_WORKERS = min(os.cpu_count() or 1, 4)
+PDF_PARALLEL_MIN_PAGES = 20
+# JSON indenté uniquement pour le débogage: en production l'indentation ne fait qu'ajouter des tokens
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if os.getenv("DEBUG_JSON_INDENT") == "1" else 0)
+EMBED_CACHE_PATH = Path(".cache/embeddings.sqlite")
+SPLITS_CACHE_DIR = Path(".cache")
+# Fichier -> hash du contenu + IDs des points Qdrant, pour ne réindexer que ce qui a changé
+MANIFEST_PATH = Path(".cache/ingest_manifest.json")
+# Réponses générées gardées 5 minutes, 256 au plus
+ANSWER_CACHE_TTL = 300
+ANSWER_CACHE_SIZE = 256
+# Stratégie de l'onglet -> force_strategy de HybridRAG.query (None: routeur automatique)
+ANSWER_STRATEGIES = MappingProxyType({"simple": "simple", "hybrid": "multi_hop", "auto": None})
+# Feuille de style lue une seule fois au chargement du module, pas à chaque rerun
+APP_CSS = (Path(__file__).parent / "static" / "app.css").read_text(encoding="utf-8")
+
+# Fonctions de chargement: chaque loader produit des paires (texte, métadonnées),
+# les Documents LangChain ne sont créés qu'après le découpage en chunks
 def load_txt(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    return [Document(page_content=content, metadata={"source": file_path, "type": "txt"})]
+    with open(file_path, 'rb') as f:
+        # mmap refuse les fichiers vides
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        # Décodage direct depuis le fichier projeté en mémoire, sans copie intermédiaire en bytes
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            content = str(mm, 'utf-8')
+    return [(content, {"source": file_path, "type": "txt"})]
 
 def load_json(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    content = json.dumps(data, indent=2, ensure_ascii=False)
-    return [Document(page_content=content, metadata={"source": file_path, "type": "json"})]
+    # Une lecture binaire, parsing et sérialisation compacte en C (orjson)
+    return load_json_bytes(Path(file_path).read_bytes(), file_path)
 
 def load_csv(file_path):
-    documents = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for i, row in enumerate(reader):
-            content = "\n".join([f"{k}: {v}" for k, v in row.items()])
-            documents.append(
-                Document(page_content=content, metadata={"source": file_path, "type": "csv", "row": i})
-            )
-    return documents
-
-def load_pdf(file_path):
-    """Version classique pypdf (fallback)"""
-    reader = PdfReader(file_path)
-    documents = []
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text()
-        if text.strip():
-            documents.append(
-                Document(page_content=text, metadata={"source": file_path, "type": "pdf", "page": i})
-            )
-    return documents
+    return _csv_rows(pd.read_csv(file_path, dtype=str, keep_default_na=False), file_path)
+
+def _csv_rows(df, source):
+    if df.empty:
+        return []
+    # Concaténation vectorisée "colonne: valeur" sur toutes les lignes à la fois
+    labelled = [f"{col}: " + df[col] for col in df.columns]
+    contents = labelled[0].str.cat(labelled[1:], sep="\n")
+    return [
+        (content, {"source": source, "type": "csv", "row": i})
+        for i, content in enumerate(contents.tolist())
+    ]
+
+# Variantes en mémoire (fichiers importés via l'interface): même sortie que les loaders ci-dessus
+def load_txt_bytes(data, source):
+    if not data:
+        return []
+    return [(str(data, 'utf-8'), {"source": source, "type": "txt"})]
+
+def load_json_bytes(data, source):
+    content = orjson.dumps(orjson.loads(data), option=JSON_OPTIONS).decode("utf-8")
+    return [(content, {"source": source, "type": "json"})]
+
+def load_csv_bytes(data, source):
+    return _csv_rows(pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False), source)
+
+def load_pdf_bytes(data, source):
+    doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        for i, page in enumerate(doc):
+            text = _page_text(page)
+            if text.strip():
+                yield text, {"source": source, "type": "pdf", "page": i}
+    finally:
+        doc.close()
+
+def _page_text(page):
+    """Texte d'une page PyMuPDF, blocs triés dans l'ordre de lecture (colonnes, tableaux)"""
+    return page.get_text("text", sort=True)
+
+def _extract_pages(file_path, start, stop):
+    """Extrait le texte des pages [start, stop) dans un processus worker (fitz n'est pas thread-safe)"""
+    doc = fitz.open(file_path)
+    try:
+        return [_page_text(doc[i]) for i in range(start, stop)]
+    finally:
+        doc.close()
 
-def load_pdf_with_pixtral(file_path):
+def load_pdf(file_path, parallel_pages=True):
+    """
+    Version classique PyMuPDF (fallback), une page à la fois.
+    parallel_pages=False: pas de pool de pages, pour un appel depuis un processus worker
+    (les fichiers y sont déjà traités en parallèle).
+    """
+    doc = fitz.open(file_path)
+    try:
+        n_pages = doc.page_count
+        if not parallel_pages or n_pages < PDF_PARALLEL_MIN_PAGES:
+            for i, page in enumerate(doc):
+                text = _page_text(page)
+                if text.strip():
+                    yield text, {"source": file_path, "type": "pdf", "page": i}
+            return
+    finally:
+        doc.close()
+
+    # Gros PDF: une plage de pages par worker, chaque worker rouvre le fichier
+    step = -(-n_pages // PDF_PAGE_WORKERS)
+    ranges = [(start, min(start + step, n_pages)) for start in range(0, n_pages, step)]
+    with ProcessPoolExecutor(max_workers=PDF_PAGE_WORKERS) as executor:
+        futures = [executor.submit(_extract_pages, file_path, start, stop) for start, stop in ranges]
+        for (start, _), future in zip(ranges, futures):
+            for i, text in enumerate(future.result(), start):
+                if text.strip():
+                    yield text, {"source": file_path, "type": "pdf", "page": i}
+
+def load_pdf_with_pixtral(file_path, use_pixtral=True):
     """
     Charge un PDF avec traitement Pixtral optionnel.
-    Fallback gracieux vers pypdf en cas d'erreur.
+    Fallback gracieux vers PyMuPDF en cas d'erreur.
     """
-    # Récupérer le paramètre use_pixtral depuis session_state
-    use_pixtral = st.session_state.get('use_pixtral', True)
-
     if not use_pixtral:
         return load_pdf(file_path)
 
@@ -86,52 +202,404 @@ def load_pdf_with_pixtral(file_path):
 
         documents = processor.process_pdf_complete(
             file_path,
-            dpi=200,
+            dpi=150,
             progress_callback=progress_callback
         )
 
         if documents:
             st.sidebar.success(f"✅ {len(documents)} chunks enrichis créés avec Pixtral!")
 
-        return documents
+        return [(doc.page_content, doc.metadata) for doc in documents]
 
     except Exception as e:
-        st.warning(f"⚠️ Erreur Pixtral pour {Path(file_path).name}, fallback sur pypdf: {e}")
+        st.warning(f"⚠️ Erreur Pixtral pour {Path(file_path).name}, fallback sur PyMuPDF: {e}")
         return load_pdf(file_path)
 
+def _load_file(loader, file_path):
+    """Exécute un loader dans un processus worker (les générateurs ne sont pas picklables)"""
+    return list(loader(file_path))
+
+_LOADERS = MappingProxyType({
+    '.txt': load_txt,
+    '.json': load_json,
+    '.csv': load_csv,
+    '.pdf': load_pdf
+})
+
+_BYTES_LOADERS = MappingProxyType({
+    '.txt': load_txt_bytes,
+    '.json': load_json_bytes,
+    '.csv': load_csv_bytes,
+    '.pdf': load_pdf_bytes
+})
+
+_SUPPORTED_EXTENSIONS = frozenset(_LOADERS)
+
+def _walk(root):
+    """Parcours récursif via os.scandir (type de fichier lu sans stat supplémentaire)"""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            elif entry.is_file():
+                yield entry.path
+
+def _iter_data_files(data_path):
+    """Parcourt uniquement les fichiers dont l'extension a un loader"""
+    return (
+        Path(path) for path in _walk(data_path)
+        if os.path.splitext(path)[1].lower() in _SUPPORTED_EXTENSIONS
+    )
+
+def _files_fingerprint(file_paths):
+    """Empreinte (chemin, mtime, taille) des fichiers: change dès qu'un fichier est modifié"""
+    return tuple(sorted(
+        (str(p), stat.st_mtime_ns, stat.st_size)
+        for p in file_paths
+        for stat in (p.stat(),)
+    ))
+
 def load_documents_from_directory(directory):
-    all_documents = []
     data_path = Path(directory)
 
     if not data_path.exists():
-        return all_documents
+        return []
 
-    loaders = {
-        '.txt': load_txt,
-        '.json': load_json,
-        '.csv': load_csv,
-        '.pdf': load_pdf_with_pixtral  # Utilise Pixtral par défaut
-    }
+    return load_documents(list(_iter_data_files(data_path)))
 
-    for file_path in data_path.rglob('*'):
-        if file_path.is_file():
-            ext = file_path.suffix.lower()
-            if ext in loaders:
-                try:
-                    docs = loaders[ext](str(file_path))
-                    all_documents.extend(docs)
-                except Exception as e:
-                    st.warning(f"Erreur lors du chargement de {file_path.name}: {e}")
+def load_documents(file_paths):
+    use_pixtral = st.session_state.get('use_pixtral', True)
+    return _load_documents(_files_fingerprint(file_paths), use_pixtral)
+
+@st.cache_data(max_entries=4, ttl="1h", show_spinner=False)
+def _load_documents(fingerprint, use_pixtral):
+    """Chargement effectif, mis en cache tant que l'empreinte des fichiers est inchangée"""
+    all_documents = []
+
+    file_paths = [Path(path) for path, _, _ in fingerprint]
+    max_workers = min(os.cpu_count() or 1, 6)
+
+    # Les threads Pixtral affichent leur progression: ils doivent partager le contexte Streamlit
+    ctx = get_script_run_ctx()
+
+    def attach_script_run_ctx():
+        add_script_run_ctx(threading.current_thread(), ctx)
+
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=attach_script_run_ctx) as thread_pool, \
+            ProcessPoolExecutor(max_workers=max_workers) as process_pool:
+        futures = {}
+        for p in file_paths:
+            ext = p.suffix.lower()
+            if ext != '.pdf':
+                loader = _LOADERS.get(ext)
+                if loader is None:
+                    continue
+                futures[thread_pool.submit(_load_file, loader, str(p))] = p
+            elif use_pixtral:
+                # Pixtral est limité par les appels réseau: des threads suffisent
+                futures[thread_pool.submit(_load_file, load_pdf_with_pixtral, str(p))] = p
+            else:
+                # Extraction PyMuPDF limitée par le CPU: processus séparés, un par fichier
+                # (sans pool de pages imbriqué dans chaque worker)
+                futures[process_pool.submit(_load_file, partial(load_pdf, parallel_pages=False), str(p))] = p
+
+        for future in as_completed(futures):
+            try:
+                all_documents.extend(future.result())
+            except Exception as e:
+                st.warning(f"Erreur lors du chargement de {futures[future].name}: {e}")
 
     return all_documents
 
-# Initialisation du cache Streamlit
-@st.cache_resource
-def init_components():
-    qdrant_client = QdrantClient(
+@lru_cache(maxsize=1)
+def _get_split_text():
+    """Fonction de découpage, construite une seule fois par processus"""
+    if SPLITTER_BACKEND == "langchain":
+        return RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP
+        ).split_text
+    # Découpage récursif par caractères implémenté en Rust
+    return TextSplitter(capacity=CHUNK_SIZE, overlap=CHUNK_OVERLAP).chunks
+
+def iter_chunks(documents):
+    """Découpe les paires (texte, métadonnées) à la volée, un Document par chunk"""
+    split_text = _get_split_text()
+
+    for text, metadata in documents:
+        for i, chunk in enumerate(split_text(text)):
+            yield Document(page_content=chunk, metadata={**metadata, "chunk_id": i})
+
+def _splits_cache_path(file_path, use_pixtral):
+    """
+    Cache des chunks d'un fichier: splits-<chemin>-<version>.pkl, la version couvrant
+    (mtime, taille), Pixtral et la configuration du découpage
+    """
+    path_key = hashlib.blake2b(str(file_path).encode('utf-8'), digest_size=8).hexdigest()
+    key = repr((_files_fingerprint([file_path]), use_pixtral, SPLITTER_BACKEND, CHUNK_SIZE, CHUNK_OVERLAP))
+    return SPLITS_CACHE_DIR / f"splits-{path_key}-{hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()}.pkl"
+
+def _read_splits_cache(cache_path):
+    with open(cache_path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def iter_corpus_chunks(file_paths, load=load_documents):
+    """
+    Chunks des fichiers donnés. Chaque fichier est relu depuis son cache disque si ni lui
+    ni la configuration de découpage n'ont changé, sinon recalculé et persisté au passage.
+    `load` produit les paires (texte, métadonnées) des fichiers absents du cache.
+    """
+    use_pixtral = st.session_state.get('use_pixtral', True)
+    cache_paths = {str(p): _splits_cache_path(p, use_pixtral) for p in file_paths}
+
+    missing = []
+    for p in file_paths:
+        cache_path = cache_paths[str(p)]
+        if cache_path.exists():
+            yield from _read_splits_cache(cache_path)
+        else:
+            missing.append(p)
+    if not missing:
+        return
+
+    SPLITS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Les chunks d'un même fichier sont contigus: un fichier de cache par groupe
+    for source, chunks in groupby(iter_chunks(load(missing)), key=lambda chunk: chunk.metadata["source"]):
+        cache_path = cache_paths[source]
+        tmp_path = cache_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    yield chunk
+
+            # Le cache n'est publié qu'une fois complet; les versions précédentes
+            # de ce même fichier sont supprimées
+            for old_path in SPLITS_CACHE_DIR.glob(f"{cache_path.name.rsplit('-', 1)[0]}-*.pkl"):
+                old_path.unlink()
+            os.replace(tmp_path, cache_path)
+        finally:
+            # Consommateur arrêté en cours de route: pas de fichier temporaire orphelin
+            tmp_path.unlink(missing_ok=True)
+
+def _dedupe_chunks(chunks, duplicates):
+    """
+    Ne laisse passer que la première occurrence de chaque chunk (en-têtes, pieds de page...).
+    L'ID du point Qdrant dérive du hash du contenu; les métadonnées des doublons sont
+    regroupées dans `duplicates` (ID du point -> liste des métadonnées de toutes les occurrences).
+    """
+    seen = {}
+    for chunk in chunks:
+        digest = hashlib.blake2b(chunk.page_content.encode("utf-8"), digest_size=16).digest()
+        point_id = str(uuid.UUID(bytes=digest))
+        if point_id in seen:
+            duplicates.setdefault(point_id, [seen[point_id]]).append(chunk.metadata)
+            continue
+        seen[point_id] = chunk.metadata
+        chunk.id = point_id
+        yield chunk
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+@lru_cache(maxsize=1)
+def get_event_loop():
+    """
+    Boucle asyncio dédiée, tournant dans un thread de fond et partagée par toutes les sessions.
+    Le client HTTP asynchrone de Mistral reste ainsi attaché à une seule boucle.
+    Créée une seule fois par processus (un vidage de st.cache_resource n'en relance pas
+    une seconde) et arrêtée à la sortie.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    atexit.register(_stop_event_loop, loop, thread)
+    return loop
+
+def _stop_event_loop(loop, thread):
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    if not loop.is_running():
+        loop.close()
+
+async def _aembed_batches(embeddings, batches):
+    semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def embed(batch):
+        async with semaphore:
+            return await embeddings.aembed_documents(batch)
+
+    return await asyncio.gather(*(embed(batch) for batch in batches))
+
+def _embed_batches(embeddings, texts):
+    """Embed les textes par lots, les requêtes HTTP étant lancées en concurrence (asyncio)"""
+    batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    future = asyncio.run_coroutine_threadsafe(_aembed_batches(embeddings, batches), get_event_loop())
+    return [vector for batch in future.result() for vector in batch]
+
+def _open_embed_cache():
+    EMBED_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(EMBED_CACHE_PATH)
+    conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB)")
+    return conn
+
+def embed_texts(embeddings, texts):
+    """
+    Embed les textes en réutilisant le cache disque (clé: sha256 modèle + contenu).
+    Seuls les textes jamais vus sont envoyés à l'API Mistral.
+    """
+    keys = [hashlib.sha256(f"{embeddings.model}:{t}".encode("utf-8")).hexdigest() for t in texts]
+
+    conn = _open_embed_cache()
+    try:
+        cached = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for i in range(0, len(unique_keys), 500):
+            batch = unique_keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE hash IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            cached.update((h, array('f', blob).tolist()) for h, blob in rows)
+
+        missing = {k: t for k, t in zip(keys, texts) if k not in cached}
+        if missing:
+            vectors = _embed_batches(embeddings, list(missing.values()))
+            cached.update(zip(missing.keys(), vectors))
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)",
+                    [(k, array('f', v).tobytes()) for k, v in zip(missing.keys(), vectors)]
+                )
+    finally:
+        conn.close()
+
+    return [cached[k] for k in keys]
+
+def _file_digest(path):
+    # Lecture par blocs de 1 Mo (hashlib.file_digest n'existe qu'à partir de Python 3.11)
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _read_manifest():
+    try:
+        return orjson.loads(MANIFEST_PATH.read_bytes())
+    except FileNotFoundError:
+        return None
+
+def _write_manifest(manifest):
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = MANIFEST_PATH.with_suffix(".tmp")
+    tmp_path.write_bytes(orjson.dumps(manifest))
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def _sync_manifest(manifest, file_paths):
+    """
+    Compare data/ au manifeste (chemin -> hash, mtime, taille, IDs des points Qdrant).
+    Le contenu n'est re-hashé que si mtime ou taille ont changé.
+
+    Returns:
+        (nouveau manifeste, fichiers nouveaux/modifiés à indexer, IDs des points devenus obsolètes)
+    """
+    current = {}
+    changed = []
+    for p in file_paths:
+        stat = p.stat()
+        entry = manifest.get(str(p))
+        if entry and (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+            current[str(p)] = entry
+            continue
+
+        digest = _file_digest(p)
+        if entry and entry["hash"] == digest:
+            current[str(p)] = {**entry, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+            continue
+
+        current[str(p)] = {"hash": digest, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "points": []}
+        changed.append(p)
+
+    # Points des fichiers supprimés ou modifiés, sauf ceux partagés avec un fichier inchangé
+    stale = [path for path in manifest if path not in current] + [str(p) for p in changed if str(p) in manifest]
+    kept = set(chain.from_iterable(entry["points"] for entry in current.values()))
+    obsolete = set(chain.from_iterable(manifest[path]["points"] for path in stale)) - kept
+    return current, changed, obsolete
+
+def _point_payload(chunk):
+    """Payload au format attendu par QdrantVectorStore, avec le domaine du chunk"""
+    return {
+        "page_content": chunk.page_content,
+        "metadata": {**chunk.metadata, "doc_type": classify_domain(chunk.page_content)}
+    }
+
+def _record_duplicates(qdrant_client, duplicates, manifest):
+    """Un seul point par chunk dupliqué, avec la liste de toutes ses sources"""
+    for point_id, sources in duplicates.items():
+        qdrant_client.set_payload(
+            collection_name=COLLECTION_NAME,
+            payload={"sources": sources},
+            points=[point_id],
+            key="metadata"
+        )
+        for metadata in sources[1:]:
+            manifest[metadata["source"]]["points"].append(point_id)
+
+def _manifest_matches(manifest, file_paths):
+    """Vrai si data/ contient exactement les fichiers du manifeste, avec mêmes mtime et taille"""
+    if len(manifest) != len(file_paths):
+        return False
+    for p in file_paths:
+        entry = manifest.get(str(p))
+        if entry is None:
+            return False
+        stat = p.stat()
+        if (entry["mtime_ns"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+            return False
+    return True
+
+def create_qdrant_client():
+    """Client Qdrant en gRPC si le serveur l'expose, sinon repli sur REST"""
+    client = QdrantClient(
         url=QDRANT_ENDPOINT,
-        api_key=QDRANT_API_KEY
+        api_key=QDRANT_API_KEY,
+        prefer_grpc=True,
+        grpc_port=QDRANT_GRPC_PORT,
+        timeout=QDRANT_TIMEOUT
+    )
+    try:
+        client.get_collections()
+        return client
+    except Exception:
+        client.close()
+        return QdrantClient(
+            url=QDRANT_ENDPOINT,
+            api_key=QDRANT_API_KEY,
+            timeout=QDRANT_TIMEOUT
+        )
+
+@st.cache_resource
+def get_neo4j_driver():
+    """Driver Neo4j unique (thread-safe) pour toute l'application: requêtes, dashboard et chargement"""
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI"),
+        auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")),
+        **NEO4J_DRIVER_OPTIONS
     )
+    atexit.register(driver.close)
+    return driver
+
+# Initialisation du cache Streamlit
+@st.cache_resource(max_entries=2, ttl="6h")
+def init_components():
+    qdrant_client = create_qdrant_client()
 
     embeddings = MistralAIEmbeddings(
         model="mistral-embed",
@@ -144,220 +612,300 @@ def init_components():
         temperature=0
     )
 
-    hybrid_rag = HybridRAG()
+    # Un seul client Mistral et un seul pool Neo4j pour toute l'application
+    hybrid_rag = HybridRAG(neo4j_driver=get_neo4j_driver(), llm=llm)
 
     return qdrant_client, embeddings, llm, hybrid_rag
 
-@st.cache_resource
+@st.cache_resource(max_entries=2, ttl="6h")
 def load_and_index_documents(_qdrant_client, _embeddings):
-    documents = load_documents_from_directory("data")
-
-    if not documents:
-        return None, 0
-
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    splits = text_splitter.split_documents(documents)
-
-    # Vérifier si la collection existe déjà
-    try:
-        collections = _qdrant_client.get_collections().collections
-        collection_exists = any(c.name == COLLECTION_NAME for c in collections)
-
-        if collection_exists:
-            # Collection existe, l'utiliser directement
-            vector_store = QdrantVectorStore(
+    data_path = Path("data")
+    file_paths = list(_iter_data_files(data_path)) if data_path.exists() else []
+
+    # Démarrage à chaud: la collection Qdrant fait office de cache si data/ n'a pas bougé
+    manifest = _read_manifest()
+    if manifest is not None and _manifest_matches(manifest, file_paths):
+        try:
+            num_chunks = _qdrant_client.get_collection(COLLECTION_NAME).points_count or 0
+        except Exception:
+            num_chunks = 0
+        if num_chunks > 0:
+            return QdrantVectorStore(
                 client=_qdrant_client,
                 collection_name=COLLECTION_NAME,
                 embedding=_embeddings
-            )
-            return vector_store, len(splits)
-    except:
-        pass
-
-    # Collection n'existe pas, la créer
-    vector_store = QdrantVectorStore.from_documents(
-        splits,
-        _embeddings,
-        url=QDRANT_ENDPOINT,
-        api_key=QDRANT_API_KEY,
-        collection_name=COLLECTION_NAME
-    )
-
-    return vector_store, len(splits)
-
-# Interface Streamlit
-def main():
-    st.set_page_config(
-        page_title="RAG Hybride GreenPower",
-        layout="wide",
-        page_icon="🌿",
-        initial_sidebar_state="expanded"
-    )
-
-    # CSS personnalisé pour améliorer l'UI
-    st.markdown("""
-        <style>
-        /* Amélioration des titres */
-        h1 {
-            font-weight: 700;
-            letter-spacing: -0.5px;
-            background: linear-gradient(120deg, #10b981, #059669);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            padding-bottom: 1rem;
+            ), num_chunks
+
+    collection_exists = _qdrant_client.collection_exists(COLLECTION_NAME)
+    if not collection_exists:
+        manifest = {}
+    if manifest is None:
+        # Collection antérieure au manifeste: on l'adopte telle quelle (🗑️ Reset pour tout reconstruire)
+        manifest = {
+            str(p): {"hash": _file_digest(p), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "points": []}
+            for p in file_paths
+            for stat in (p.stat(),)
         }
 
-        h2 {
-            font-weight: 600;
-            padding-top: 1rem;
-            border-bottom: 2px solid #10b981;
-            padding-bottom: 0.5rem;
-        }
+    manifest, changed, obsolete = _sync_manifest(manifest, file_paths)
+    if obsolete:
+        _qdrant_client.delete(
+            collection_name=COLLECTION_NAME,
+            points_selector=PointIdsList(points=list(obsolete))
+        )
 
-        h3 {
-            font-weight: 600;
-            color: #10b981;
-            margin-top: 1.5rem;
-        }
+    # Indexer uniquement les fichiers nouveaux ou modifiés, lot par lot (embeddings au fil de l'eau)
+    created = False
+    duplicates = {}
+    embedded = (
+        (batch, embed_texts(_embeddings, [chunk.page_content for chunk in batch]))
+        for batch in _batched(_dedupe_chunks(iter_corpus_chunks(changed), duplicates), INGEST_BATCH_SIZE)
+    )
+    first = next(embedded, None)
+
+    if first is not None and not collection_exists:
+        # Indexation HNSW désactivée pendant l'upload, puis réactivée en une passe
+        _qdrant_client.create_collection(
+            collection_name=COLLECTION_NAME,
+            vectors_config=VectorParams(size=len(first[1][0]), distance=Distance.COSINE),
+            optimizers_config=OptimizersConfigDiff(indexing_threshold=0),
+            hnsw_config=HnswConfigDiff(on_disk=False),
+            # Vecteurs int8 en RAM (4x moins de mémoire), rescoring sur les originaux
+            quantization_config=ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        )
+        # Index du domaine des chunks, utilisé pour filtrer la recherche vectorielle
+        _qdrant_client.create_payload_index(
+            collection_name=COLLECTION_NAME,
+            field_name="metadata.doc_type",
+            field_schema=PayloadSchemaType.KEYWORD
+        )
+        collection_exists = True
+        created = True
+
+    def iter_points():
+        for batch, vectors in chain([first], embedded):
+            for chunk, vector in zip(batch, vectors):
+                manifest[chunk.metadata["source"]]["points"].append(chunk.id)
+                yield PointStruct(id=chunk.id, vector=vector, payload=_point_payload(chunk))
+
+    if first is not None:
+        # Un seul upload (un seul pool de workers) alimenté par les lots au fur et à mesure
+        _qdrant_client.upload_points(
+            collection_name=COLLECTION_NAME,
+            points=iter_points(),
+            parallel=QDRANT_UPLOAD_PARALLEL,
+            batch_size=QDRANT_UPLOAD_BATCH_SIZE
+        )
 
-        /* Amélioration des cartes métriques */
-        [data-testid="stMetricValue"] {
-            font-size: 2rem;
-            font-weight: 700;
-            color: #10b981;
-        }
+    if not collection_exists:
+        return None, 0
 
-        [data-testid="stMetricLabel"] {
-            font-size: 0.9rem;
-            font-weight: 500;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }
+    _record_duplicates(_qdrant_client, duplicates, manifest)
 
-        /* Amélioration des expanders */
-        .streamlit-expanderHeader {
-            font-weight: 600;
-            background-color: rgba(16, 185, 129, 0.1);
-            border-radius: 8px;
-            padding: 0.5rem;
-        }
+    if created:
+        _qdrant_client.update_collection(
+            collection_name=COLLECTION_NAME,
+            optimizer_config=OptimizersConfigDiff(indexing_threshold=20000)
+        )
 
-        /* Amélioration des inputs */
-        .stTextInput input {
-            border-radius: 8px;
-            border: 2px solid #10b981;
-            padding: 0.75rem;
-            font-size: 1rem;
-        }
+    # Fichiers en échec au chargement (ou sans aucun chunk): hors du manifeste,
+    # pour être retentés au prochain démarrage au lieu d'être tenus pour indexés
+    for p in changed:
+        if not manifest[str(p)]["points"]:
+            del manifest[str(p)]
 
-        .stTextInput input:focus {
-            border-color: #059669;
-            box-shadow: 0 0 0 3px rgba(16, 185, 129, 0.1);
-        }
+    for entry in manifest.values():
+        entry["points"] = list(dict.fromkeys(entry["points"]))
+    _write_manifest(manifest)
 
-        /* Amélioration des boutons */
-        .stButton button {
-            border-radius: 8px;
-            font-weight: 600;
-            padding: 0.5rem 1.5rem;
-            transition: all 0.3s ease;
-            border: 2px solid transparent;
-        }
+    vector_store = QdrantVectorStore(
+        client=_qdrant_client,
+        collection_name=COLLECTION_NAME,
+        embedding=_embeddings
+    )
 
-        .stButton button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 4px 12px rgba(16, 185, 129, 0.3);
-        }
+    num_chunks = _qdrant_client.count(COLLECTION_NAME, exact=False).count
+    if num_chunks == 0:
+        return None, 0
 
-        /* Amélioration des tabs */
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 8px;
-            background-color: rgba(16, 185, 129, 0.05);
-            padding: 0.5rem;
-            border-radius: 8px;
-        }
+    return vector_store, num_chunks
 
-        .stTabs [data-baseweb="tab"] {
-            height: 50px;
-            background-color: transparent;
-            border-radius: 8px;
-            font-weight: 600;
-            padding: 0 1.5rem;
-        }
+def index_uploaded_files(qdrant_client, embeddings, uploads):
+    """
+    Indexe des fichiers importés directement depuis leur contenu en mémoire,
+    par upsert dans la collection existante (sans relire ni réindexer data/).
 
-        .stTabs [aria-selected="true"] {
-            background-color: #10b981;
-        }
+    Args:
+        uploads: liste de (chemin dans data/, contenu en bytes), fichiers déjà sauvegardés
 
-        /* Amélioration des messages info/success */
-        .stAlert {
-            border-radius: 8px;
-            border-left: 4px solid #10b981;
-            padding: 1rem;
+    Returns:
+        Nombre de chunks indexés
+    """
+    manifest = _read_manifest()
+    entries = {}
+    for path, data in uploads:
+        stat = path.stat()
+        entries[str(path)] = {
+            "hash": hashlib.blake2b(data, digest_size=16).hexdigest(),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "points": []
         }
 
-        /* Amélioration du spinner */
-        .stSpinner > div {
-            border-top-color: #10b981;
-        }
+    use_pixtral = st.session_state.get('use_pixtral', True)
+    contents = dict(uploads)
+
+    def load_uploads(paths):
+        return chain.from_iterable(
+            # Pixtral travaille sur le fichier sauvegardé (rastérisation par pdftoppm)
+            load_pdf_with_pixtral(str(path)) if use_pixtral and path.suffix.lower() == '.pdf'
+            else _BYTES_LOADERS[path.suffix.lower()](contents[path], str(path))
+            for path in paths
+        )
 
-        /* Amélioration de la sidebar */
-        [data-testid="stSidebar"] {
-            background: linear-gradient(180deg, rgba(16, 185, 129, 0.05) 0%, transparent 100%);
-        }
+    num_chunks = 0
+    duplicates = {}
+    # Même cache de découpage par fichier que l'indexation de data/
+    chunks = iter_corpus_chunks(list(contents), load_uploads)
+    for batch in _batched(_dedupe_chunks(chunks, duplicates), INGEST_BATCH_SIZE):
+        vectors = embed_texts(embeddings, [chunk.page_content for chunk in batch])
+        qdrant_client.upsert(
+            collection_name=COLLECTION_NAME,
+            points=[
+                PointStruct(
+                    id=chunk.id,
+                    vector=vector,
+                    payload=_point_payload(chunk)
+                )
+                for chunk, vector in zip(batch, vectors)
+            ]
+        )
+        for chunk in batch:
+            entries[chunk.metadata["source"]]["points"].append(chunk.id)
+        num_chunks += len(batch)
+
+    _record_duplicates(qdrant_client, duplicates, entries)
+
+    if manifest is not None:
+        # Fichiers remplacés: leurs anciens points non repris sont supprimés
+        replaced = [manifest[path] for path in entries if path in manifest]
+        manifest.update(entries)
+        kept = set(chain.from_iterable(entry["points"] for entry in manifest.values()))
+        obsolete = set(chain.from_iterable(entry["points"] for entry in replaced)) - kept
+        if obsolete:
+            qdrant_client.delete(
+                collection_name=COLLECTION_NAME,
+                points_selector=PointIdsList(points=list(obsolete))
+            )
+        for entry in entries.values():
+            entry["points"] = list(dict.fromkeys(entry["points"]))
+        _write_manifest(manifest)
 
-        /* Amélioration des dividers */
-        hr {
-            margin: 2rem 0;
-            border: none;
-            height: 2px;
-            background: linear-gradient(90deg, transparent, #10b981, transparent);
-        }
+    return num_chunks
 
-        /* Amélioration des dataframes */
-        .dataframe {
-            border-radius: 8px;
-            overflow: hidden;
-        }
+@st.cache_resource
+def get_answer_cache():
+    """
+    Réponses déjà générées, partagées entre sessions:
+    (question, stratégie) -> (horodatage, résultat)
+    """
+    return {}
 
-        /* Animation de fade-in pour le contenu */
-        .element-container {
-            animation: fadeIn 0.5s ease-in;
-        }
+def _render_answer(answer, container=st):
+    container.markdown(f"""
+        <div style='background: rgba(16, 185, 129, 0.05); padding: 1.5rem; border-radius: 8px; margin: 1rem 0; font-size: 1.05rem; line-height: 1.6;'>
+            {answer}
+        </div>
+    """, unsafe_allow_html=True)
 
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(10px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
+def answer_query(question, strategy, hybrid_rag, vector_store, spinner_text):
+    """
+    Affiche la réponse à une question et retourne le résultat complet.
+    Les tokens sont affichés au fil de la génération; la réponse finale est gardée
+    ANSWER_CACHE_TTL secondes par (question, stratégie) et réaffichée sans appel au LLM.
+    """
+    cache = get_answer_cache()
+    key = (question, strategy)
+    cached = cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < ANSWER_CACHE_TTL:
+        st.markdown("---")
+        st.markdown("### ✨ Réponse")
+        _render_answer(cached[1]["answer"])
+        return cached[1]
+
+    with st.spinner(spinner_text):
+        # Récupération des contextes; seule la génération reste à streamer
+        result = hybrid_rag.query(question, vector_store, force_strategy=ANSWER_STRATEGIES[strategy], stream=True)
+
+    st.markdown("---")
+    st.markdown("### ✨ Réponse")
+    placeholder = st.empty()
+    result["answer"] = placeholder.write_stream(result["answer"])
+    _render_answer(result["answer"], placeholder)
+
+    cache.pop(key, None)
+    cache[key] = (time.monotonic(), result)
+    # Éviction des plus anciennes entrées (ordre d'insertion)
+    for stale_key in list(cache)[:-ANSWER_CACHE_SIZE]:
+        cache.pop(stale_key, None)
+    return result
 
-        /* Style des badges personnalisés */
-        .badge {
-            display: inline-block;
-            padding: 0.35rem 0.65rem;
-            font-size: 0.85rem;
-            font-weight: 600;
-            line-height: 1;
-            border-radius: 6px;
-            margin: 0.25rem;
-        }
+@st.cache_resource
+def get_neo4j_loader():
+    """Loader Neo4j partagé, sur le driver commun de l'application"""
+    return Neo4jLoader(get_neo4j_driver())
+
+def _truncate_value(value, max_chars=500):
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else value[:max_chars] + "..."
+    if isinstance(value, list):
+        return [_truncate_value(v, max_chars) for v in value]
+    return value
+
+def sources_preview(tab_key, question, result, content_chars, graph_items):
+    """
+    Aperçus tronqués des sources (documents et résultats Neo4j) pour l'affichage.
+    Calculés une fois par question et conservés dans la session (dernier aperçu par onglet).
+    """
+    question_hash = hashlib.sha256(question.encode("utf-8")).hexdigest()
+    cached = st.session_state.get(f"render_{tab_key}")
+    if cached and cached[0] == question_hash:
+        return cached[1]
+
+    docs = result["sources"]["vector_docs"]
+    preview = {
+        # Un seul tableau par expander plutôt qu'un bloc markdown par document
+        "docs": pd.DataFrame(
+            {
+                "Source": [doc.metadata.get('source', 'N/A') for doc in docs],
+                "Extrait": [doc.page_content[:content_chars] + "..." for doc in docs],
+            },
+            index=pd.RangeIndex(1, len(docs) + 1),
+        ),
+        "graph": [
+            (item['query_type'], [
+                {k: _truncate_value(v) for k, v in row.items()}
+                for row in item["results"][:graph_items]
+            ])
+            for item in result["sources"].get("graph_context", [])
+        ]
+    }
+    st.session_state[f"render_{tab_key}"] = (question_hash, preview)
+    return preview
 
-        .badge-success {
-            background-color: rgba(16, 185, 129, 0.2);
-            color: #10b981;
-            border: 1px solid #10b981;
-        }
+# Interface Streamlit
+def main():
+    st.set_page_config(
+        page_title="RAG Hybride GreenPower",
+        layout="wide",
+        page_icon="🌿",
+        initial_sidebar_state="expanded"
+    )
 
-        .badge-info {
-            background-color: rgba(59, 130, 246, 0.2);
-            color: #3b82f6;
-            border: 1px solid #3b82f6;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    # CSS personnalisé pour améliorer l'UI
+    st.markdown(f"<style>{APP_CSS}</style>", unsafe_allow_html=True)
 
     # En-tête avec style amélioré
     st.title("🌿 RAG Hybride - GreenPower Solutions")
@@ -401,28 +949,40 @@ def main():
                 data_dir = Path("data")
                 data_dir.mkdir(exist_ok=True)
 
-                success_count = 0
+                saved = []
                 error_count = 0
 
                 with st.spinner("💾 Sauvegarde en cours..."):
                     for uploaded_file in uploaded_files:
                         try:
                             file_path = data_dir / uploaded_file.name
-                            with open(file_path, "wb") as f:
-                                f.write(uploaded_file.getbuffer())
-                            success_count += 1
+                            data = uploaded_file.getvalue()
+                            file_path.write_bytes(data)
+                            saved.append((file_path, data))
                         except Exception as e:
                             st.error(f"❌ Erreur pour {uploaded_file.name}: {e}")
                             error_count += 1
 
-                if success_count > 0:
-                    st.success(f"✅ {success_count} fichier(s) sauvegardé(s)!")
-                    st.info("🔄 Rechargez la page pour indexer les nouveaux documents")
+                if saved:
+                    st.success(f"✅ {len(saved)} fichier(s) sauvegardé(s)!")
+
+                    if qdrant_client.collection_exists(COLLECTION_NAME):
+                        # Indexation directe depuis la mémoire, sans repasser par data/
+                        try:
+                            with st.spinner("🔄 Indexation des nouveaux documents..."):
+                                indexed = index_uploaded_files(qdrant_client, embeddings, saved)
+                            load_and_index_documents.clear()
+                            get_answer_cache().clear()
+                            st.success(f"✅ {indexed} chunks indexés dans Qdrant")
+                        except Exception as e:
+                            st.error(f"❌ Erreur lors de l'indexation: {e}")
+                    else:
+                        st.info("🔄 Rechargez la page pour indexer les nouveaux documents")
 
-                    # Bouton pour recharger immédiatement
-                    if st.button("🔄 Recharger maintenant", use_container_width=True):
-                        st.cache_resource.clear()
-                        st.rerun()
+                        # Bouton pour recharger immédiatement
+                        if st.button("🔄 Recharger maintenant", use_container_width=True):
+                            st.cache_resource.clear()
+                            st.rerun()
 
                 if error_count > 0:
                     st.warning(f"⚠️ {error_count} erreur(s) rencontrée(s)")
@@ -452,15 +1012,16 @@ def main():
         st.markdown("### 🔗 Graphe Neo4j")
         if st.button("📊 Charger Neo4j", use_container_width=True, help="Charge les données dans Neo4j"):
             with st.spinner("⏳ Chargement du graphe..."):
-                from neo4j_loader import Neo4jLoader
-                loader = Neo4jLoader()
                 try:
-                    loader.load_all()
-                    st.success("✅ Graphe chargé!")
+                    if get_neo4j_loader().load_all():
+                        # Les résultats mis en cache décrivent l'ancien graphe
+                        hybrid_rag.neo4j_querier.clear_cache()
+                        get_answer_cache().clear()
+                        st.success("✅ Graphe chargé!")
+                    else:
+                        st.info("ℹ️ Données inchangées: graphe existant conservé")
                 except Exception as e:
                     st.error(f"❌ Erreur: {e}")
-                finally:
-                    loader.close()
 
         st.divider()
 
@@ -482,7 +1043,7 @@ def main():
         else:
             st.markdown("""
                 <div style='background: rgba(100, 116, 139, 0.1); padding: 0.75rem; border-radius: 8px; margin: 0.5rem 0; font-size: 0.85rem;'>
-                    Mode extraction texte classique (pypdf)
+                    Mode extraction texte classique (PyMuPDF)
                 </div>
             """, unsafe_allow_html=True)
 
@@ -564,28 +1125,12 @@ def main():
         )
 
         if question_classic:
-            with st.spinner("🔍 Recherche de la réponse..."):
-                result = hybrid_rag.query_simple(question_classic, vector_store)
-
-            st.markdown("---")
-            st.markdown("### ✨ Réponse")
-            st.markdown(f"""
-                <div style='background: rgba(16, 185, 129, 0.05); padding: 1.5rem; border-radius: 8px; margin: 1rem 0; font-size: 1.05rem; line-height: 1.6;'>
-                    {result["answer"]}
-                </div>
-            """, unsafe_allow_html=True)
+            result = answer_query(question_classic, "simple", hybrid_rag, vector_store, "🔍 Recherche de la réponse...")
 
+            preview = sources_preview("classic", question_classic, result, 300, 0)
             with st.expander("📚 Sources utilisées (Qdrant)", expanded=False):
-                st.caption(f"**{len(result['sources']['vector_docs'])}** documents pertinents trouvés")
-                for i, doc in enumerate(result["sources"]["vector_docs"], 1):
-                    st.markdown(f"""
-                        <div style='background: rgba(100, 116, 139, 0.1); padding: 1rem; border-radius: 8px; margin: 0.5rem 0;'>
-                            <strong>📄 Source {i}:</strong> <code>{doc.metadata.get('source', 'N/A')}</code>
-                        </div>
-                    """, unsafe_allow_html=True)
-                    st.text(doc.page_content[:300] + "...")
-                    if i < len(result["sources"]["vector_docs"]):
-                        st.divider()
+                st.caption(f"**{len(preview['docs'])}** documents pertinents trouvés")
+                st.dataframe(preview["docs"], use_container_width=True)
 
     # TAB 2: RAG+Graph
     with tab2:
@@ -605,45 +1150,29 @@ def main():
         )
 
         if question_graph:
-            with st.spinner("🔄 Recherche multi-hop en cours..."):
-                result = hybrid_rag.query_hybrid(question_graph, vector_store)
-
-            st.markdown("---")
-            st.markdown("### ✨ Réponse")
-            st.markdown(f"""
-                <div style='background: rgba(16, 185, 129, 0.05); padding: 1.5rem; border-radius: 8px; margin: 1rem 0; font-size: 1.05rem; line-height: 1.6;'>
-                    {result["answer"]}
-                </div>
-            """, unsafe_allow_html=True)
+            result = answer_query(question_graph, "hybrid", hybrid_rag, vector_store, "🔄 Recherche multi-hop en cours...")
 
             st.markdown("### 📊 Sources de données")
+            preview = sources_preview("graph", question_graph, result, 200, 2)  # 2 premiers résultats
             col1, col2 = st.columns(2)
 
             with col1:
                 with st.expander("📄 Documents Vectoriels (Qdrant)", expanded=False):
-                    st.caption(f"**{len(result['sources']['vector_docs'])}** documents consultés")
-                    for i, doc in enumerate(result["sources"]["vector_docs"], 1):
-                        st.markdown(f"""
-                            <div style='background: rgba(59, 130, 246, 0.1); padding: 0.75rem; border-radius: 8px; margin: 0.5rem 0;'>
-                                <strong>📄 Document {i}:</strong> <code style='font-size: 0.85rem;'>{doc.metadata.get('source', 'N/A')}</code>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        st.text(doc.page_content[:200] + "...")
-                        if i < len(result["sources"]["vector_docs"]):
-                            st.divider()
+                    st.caption(f"**{len(preview['docs'])}** documents consultés")
+                    st.dataframe(preview["docs"], use_container_width=True)
 
             with col2:
                 with st.expander("🔗 Relations Graphiques (Neo4j)", expanded=False):
-                    graph_ctx = result["sources"]["graph_context"]
+                    graph_ctx = preview["graph"]
                     if graph_ctx:
                         st.caption(f"**{len(graph_ctx)}** requêtes graphiques exécutées")
-                        for idx, item in enumerate(graph_ctx, 1):
+                        for idx, (query_type, rows) in enumerate(graph_ctx, 1):
                             st.markdown(f"""
                                 <div style='background: rgba(16, 185, 129, 0.1); padding: 0.75rem; border-radius: 8px; margin: 0.5rem 0;'>
-                                    <strong>🔍 Requête {idx}:</strong> {item['query_type']}
+                                    <strong>🔍 Requête {idx}:</strong> {query_type}
                                 </div>
                             """, unsafe_allow_html=True)
-                            st.json(item["results"][:2])  # Afficher 2 premiers résultats
+                            st.json(rows)
                             if idx < len(graph_ctx):
                                 st.divider()
                     else:
@@ -678,60 +1207,36 @@ def main():
                 st.markdown(f"**📝 Explication:** {routing['explanation']}")
 
             # Exécuter la requête
-            with st.spinner("🤖 Traitement intelligent de la question..."):
-                result = hybrid_rag.query(question_auto, vector_store)
-
-            st.markdown("---")
-
-
-
-            st.markdown("### ✨ Réponse")
-            st.markdown(f"""
-                <div style='background: rgba(16, 185, 129, 0.05); padding: 1.5rem; border-radius: 8px; margin: 1rem 0; font-size: 1.05rem; line-height: 1.6;'>
-                    {result["answer"]}
-                </div>
-            """, unsafe_allow_html=True)
+            result = answer_query(question_auto, "auto", hybrid_rag, vector_store, "🤖 Traitement intelligent de la question...")
 
             # Sources adaptées à la stratégie
             st.markdown("### 📊 Sources consultées")
             if result["strategy"] == "multi_hop":
+                preview = sources_preview("auto", question_auto, result, 150, 1)
                 col1, col2 = st.columns(2)
                 with col1:
                     with st.expander("📄 Documents Qdrant", expanded=False):
-                        st.caption(f"**{len(result['sources']['vector_docs'])}** documents")
-                        for i, doc in enumerate(result["sources"]["vector_docs"], 1):
-                            st.markdown(f"""
-                                <div style='background: rgba(59, 130, 246, 0.1); padding: 0.75rem; border-radius: 8px; margin: 0.5rem 0;'>
-                                    <strong>📄 {i}:</strong> <code style='font-size: 0.85rem;'>{doc.metadata.get('source', 'N/A')}</code>
-                                </div>
-                            """, unsafe_allow_html=True)
-                            st.text(doc.page_content[:150] + "...")
+                        st.caption(f"**{len(preview['docs'])}** documents")
+                        st.dataframe(preview["docs"], use_container_width=True)
                 with col2:
                     with st.expander("🔗 Relations Neo4j", expanded=False):
-                        graph_ctx = result["sources"].get("graph_context", [])
+                        graph_ctx = preview["graph"]
                         if graph_ctx:
                             st.caption(f"**{len(graph_ctx)}** requêtes graphiques")
-                            for idx, item in enumerate(graph_ctx, 1):
+                            for idx, (query_type, rows) in enumerate(graph_ctx, 1):
                                 st.markdown(f"""
                                     <div style='background: rgba(16, 185, 129, 0.1); padding: 0.75rem; border-radius: 8px; margin: 0.5rem 0;'>
-                                        <strong>🔍 {idx}:</strong> {item['query_type']}
+                                        <strong>🔍 {idx}:</strong> {query_type}
                                     </div>
                                 """, unsafe_allow_html=True)
-                                st.json(item["results"][:1])
+                                st.json(rows)
                         else:
                             st.info("ℹ️ Pas de données graphiques utilisées")
             else:
+                preview = sources_preview("auto", question_auto, result, 300, 0)
                 with st.expander("📄 Documents Qdrant consultés", expanded=False):
-                    st.caption(f"**{len(result['sources']['vector_docs'])}** documents pertinents")
-                    for i, doc in enumerate(result["sources"]["vector_docs"], 1):
-                        st.markdown(f"""
-                            <div style='background: rgba(59, 130, 246, 0.1); padding: 0.75rem; border-radius: 8px; margin: 0.5rem 0;'>
-                                <strong>📄 Source {i}:</strong> <code>{doc.metadata.get('source', 'N/A')}</code>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        st.text(doc.page_content[:300] + "...")
-                        if i < len(result["sources"]["vector_docs"]):
-                            st.divider()
+                    st.caption(f"**{len(preview['docs'])}** documents pertinents")
+                    st.dataframe(preview["docs"], use_container_width=True)
 
     # TAB 4: Dashboard Métriques
     with tab4:
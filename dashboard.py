@@ -3,117 +3,235 @@ Dashboard de métriques pour le système RAG Hybride
 Affiche les statistiques de performance de Qdrant et Neo4j
 """
 
+import os
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple
 from datetime import datetime
 
+from neo4j.exceptions import ClientError
+from qdrant_client.models import QueryRequest
+
+from hybrid_rag import SEARCH_PARAMS
+from neo4j_query import Neo4jQuerier
+
+
+COLLECTION_NAME = "documents_rag"
+# Base explicite: évite la résolution de la base par défaut à chaque session
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or "neo4j"
+# Durée de vie (s) des métriques en cache, alignée sur l'auto-refresh
+METRICS_TTL = 5
+COLLECTIONS_TTL = 300
+# Nombre d'échantillons conservés par sonde pour les statistiques glissantes
+PROBE_HISTORY_SIZE = 50
+
+
+# Comptages par type de nœud et de relation en un seul aller-retour,
+# sous forme de paires [type, nombre]; les nœuds techniques LoadMeta ne sont pas comptés.
+# Un nœud est compté pour chacun de ses labels, mais une seule fois dans total_nodes.
+APOC_STATS_QUERY = """
+CALL apoc.meta.stats() YIELD labels, relTypesCount, nodeCount
+RETURN [k IN keys(labels) WHERE k <> 'LoadMeta' AND labels[k] > 0 | [k, labels[k]]] AS nodes,
+       nodeCount - coalesce(labels['LoadMeta'], 0) AS total_nodes,
+       [k IN keys(relTypesCount) WHERE relTypesCount[k] > 0 | [k, relTypesCount[k]]] AS relations
+"""
+# Repli sans APOC: les mêmes agrégations dans la même requête
+COUNTS_QUERY = """
+CALL {
+    MATCH (n)
+    WHERE NOT n:LoadMeta
+    UNWIND labels(n) AS label
+    WITH label, count(*) AS count
+    RETURN collect([label, count]) AS nodes
+}
+CALL {
+    MATCH (n)
+    WHERE NOT n:LoadMeta
+    RETURN count(n) AS total_nodes
+}
+CALL {
+    MATCH ()-[r]->()
+    WITH type(r) AS rel_type, count(r) AS count
+    RETURN collect([rel_type, count]) AS relations
+}
+RETURN nodes, total_nodes, relations
+"""
+# Passe à False dès qu'un serveur sans APOC est détecté
+_apoc_available = True
+
+
+# Les erreurs ne sont pas mises en cache: elles remontent aux méthodes de DashboardMetrics
+@st.cache_data(ttl=METRICS_TTL, show_spinner=False)
+def _fetch_qdrant_metrics(_qdrant_client, collection_name: str) -> Dict:
+    """Métriques Qdrant, partagées entre reruns et sessions pendant METRICS_TTL secondes"""
+    # Existence vérifiée directement, sans rapatrier la liste de toutes les collections
+    if not _qdrant_client.collection_exists(collection_name):
+        return {
+            "total_collections": _count_collections(_qdrant_client),
+            "documents_count": 0,
+            "vectors_count": 0,
+            "collection_exists": False
+        }
+
+    # Comptage approximatif: un entier, sans le descripteur complet de la collection
+    points_count = _qdrant_client.count(collection_name, exact=False).count
+
+    return {
+        "total_collections": _count_collections(_qdrant_client),
+        "documents_count": points_count,
+        "vectors_count": points_count,
+        "collection_exists": True,
+        "vector_size": _vector_size(_qdrant_client, collection_name)
+    }
+
+
+@st.cache_data(ttl=COLLECTIONS_TTL, show_spinner=False)
+def _count_collections(_qdrant_client) -> int:
+    """Nombre de collections: indicateur secondaire, rafraîchi moins souvent que les autres métriques"""
+    return len(_qdrant_client.get_collections().collections)
+
+
+@st.cache_data(ttl=METRICS_TTL, show_spinner=False)
+def _vector_size(_qdrant_client, collection_name: str) -> int:
+    """Dimension des vecteurs, relue après METRICS_TTL (la collection peut être recréée par un Reset)"""
+    collection_info = _qdrant_client.get_collection(collection_name)
+
+    # Gérer le cas où vectors est un dict ou un objet direct
+    vector_size = 0
+    if hasattr(collection_info.config.params, 'vectors'):
+        vectors = collection_info.config.params.vectors
+        if isinstance(vectors, dict):
+            # Cas multi-vecteurs: prendre la taille du premier vecteur
+            vector_size = next(iter(vectors.values())).size if vectors else 0
+        elif hasattr(vectors, 'size'):
+            # Cas vecteur unique
+            vector_size = vectors.size
+    return vector_size
+
+
+@st.cache_data(ttl=METRICS_TTL, show_spinner=False)
+def _fetch_neo4j_metrics(_driver) -> Dict:
+    """Métriques Neo4j, partagées entre reruns et sessions pendant METRICS_TTL secondes"""
+    global _apoc_available
+
+    with _driver.session(database=NEO4J_DATABASE) as session:
+        record = None
+        if _apoc_available:
+            # Compteurs lus dans le count store (O(1)), sans parcourir le graphe
+            try:
+                record = session.run(APOC_STATS_QUERY).single()
+            except ClientError:
+                _apoc_available = False
+        if record is None:
+            record = session.run(COUNTS_QUERY).single()
+
+    # Nœuds et relations par type, du plus fréquent au moins fréquent
+    nodes_by_type = dict(sorted(map(tuple, record["nodes"]), key=lambda item: item[1], reverse=True))
+    relations_by_type = dict(sorted(map(tuple, record["relations"]), key=lambda item: item[1], reverse=True))
+
+    # Total (nœuds multi-labels comptés une fois)
+    total_nodes = record["total_nodes"]
+    total_relations = sum(relations_by_type.values())
+
+    return {
+        "total_nodes": total_nodes,
+        "total_relations": total_relations,
+        "nodes_by_type": nodes_by_type,
+        "relations_by_type": relations_by_type
+    }
+
+
+@st.cache_data(show_spinner=False)
+def _embed_probes(_embeddings, questions: Tuple[str, ...]) -> List[List[float]]:
+    """Embeddings des questions de test, calculés une seule fois (les questions sont fixes)"""
+    return _embeddings.embed_documents(list(questions))
+
 
 class DashboardMetrics:
     """Collecte et affiche les métriques de performance du système"""
 
     def __init__(self, qdrant_client, neo4j_querier, vector_store):
         self.qdrant_client = qdrant_client
-        self.neo4j_querier = neo4j_querier
+        # Sondes mesurées sur Neo4j et non sur le cache des résultats du querier
+        self.neo4j_querier = Neo4jQuerier(neo4j_querier.driver, cache=False)
         self.vector_store = vector_store
 
-    def get_qdrant_metrics(self) -> Dict:
+    def get_qdrant_metrics(self, show_errors: bool = True) -> Dict:
         """Récupère les métriques de Qdrant"""
         try:
-            collections = self.qdrant_client.get_collections()
-            collection_name = "documents_rag"
-
-            # Vérifier si la collection existe
-            collection_exists = any(c.name == collection_name for c in collections.collections)
-
-            if not collection_exists:
-                return {
-                    "total_collections": len(collections.collections),
-                    "documents_count": 0,
-                    "vectors_count": 0,
-                    "collection_exists": False
-                }
-
-            # Récupérer les infos de la collection
-            collection_info = self.qdrant_client.get_collection(collection_name)
-
-            # Gérer le cas où vectors est un dict ou un objet direct
-            vector_size = 0
-            if hasattr(collection_info.config.params, 'vectors'):
-                vectors = collection_info.config.params.vectors
-                if isinstance(vectors, dict):
-                    # Cas multi-vecteurs: prendre la taille du premier vecteur
-                    vector_size = next(iter(vectors.values())).size if vectors else 0
-                elif hasattr(vectors, 'size'):
-                    # Cas vecteur unique
-                    vector_size = vectors.size
-
-            return {
-                "total_collections": len(collections.collections),
-                "documents_count": collection_info.points_count,
-                "vectors_count": collection_info.points_count,
-                "collection_exists": True,
-                "vector_size": vector_size
-            }
+            return _fetch_qdrant_metrics(self.qdrant_client, COLLECTION_NAME)
         except Exception as e:
-            st.error(f"Erreur lors de la récupération des métriques Qdrant: {e}")
+            if show_errors:
+                st.error(f"Erreur lors de la récupération des métriques Qdrant: {e}")
             return {"error": str(e)}
 
-    def get_neo4j_metrics(self) -> Dict:
+    def get_neo4j_metrics(self, show_errors: bool = True) -> Dict:
         """Récupère les métriques de Neo4j"""
         try:
-            with self.neo4j_querier.driver.session() as session:
-                # Compter les nœuds par type
-                result = session.run("""
-                    MATCH (n)
-                    RETURN labels(n)[0] as label, count(n) as count
-                    ORDER BY count DESC
-                """)
-                nodes_by_type = {record["label"]: record["count"] for record in result}
-
-                # Compter les relations par type
-                result = session.run("""
-                    MATCH ()-[r]->()
-                    RETURN type(r) as rel_type, count(r) as count
-                    ORDER BY count DESC
-                """)
-                relations_by_type = {record["rel_type"]: record["count"] for record in result}
-
-                # Total
-                total_nodes = sum(nodes_by_type.values())
-                total_relations = sum(relations_by_type.values())
-
-                return {
-                    "total_nodes": total_nodes,
-                    "total_relations": total_relations,
-                    "nodes_by_type": nodes_by_type,
-                    "relations_by_type": relations_by_type
-                }
+            return _fetch_neo4j_metrics(self.neo4j_querier.driver)
         except Exception as e:
-            st.error(f"Erreur lors de la récupération des métriques Neo4j: {e}")
+            if show_errors:
+                st.error(f"Erreur lors de la récupération des métriques Neo4j: {e}")
             return {"error": str(e)}
 
     def measure_qdrant_search_time(self, question: str, k: int = 3) -> Tuple[float, int]:
-        """Mesure le temps de recherche Qdrant"""
+        """Mesure le temps de recherche Qdrant (une question, via la recherche groupée)"""
+        time_ms, results_counts = self.measure_qdrant_batch_search_time([question], k)
+        return time_ms, results_counts[0]
+
+    def measure_qdrant_batch_search_time(self, questions: List[str], k: int = 3) -> Tuple[float, List[int]]:
+        """
+        Mesure le temps de recherche Qdrant pour plusieurs questions.
+        Les embeddings des questions sont mis en cache: seul Qdrant est chronométré.
+
+        Returns:
+            (temps total de la requête groupée en ms, nombre de résultats par question)
+        """
         try:
-            retriever = self.vector_store.as_retriever(search_kwargs={"k": k})
+            vectors = _embed_probes(self.vector_store.embeddings, tuple(questions))
+        except Exception as e:
+            st.error(f"Erreur lors de la mesure Qdrant: {e}")
+            return 0, [0] * len(questions)
+        return self.measure_qdrant_vectors_search_time(vectors, k)
 
-            start_time = time.time()
-            results = retriever.invoke(question)
-            end_time = time.time()
+    def measure_qdrant_vectors_search_time(self, vectors: List[List[float]], k: int = 3) -> Tuple[float, List[int]]:
+        """
+        Mesure le temps de recherche Qdrant pour des embeddings déjà calculés,
+        envoyés en une seule requête groupée.
 
-            return (end_time - start_time) * 1000, len(results)  # en ms
+        Returns:
+            (temps total de la requête groupée en ms, nombre de résultats par vecteur)
+        """
+        try:
+            requests = [
+                QueryRequest(query=vector, limit=k, params=SEARCH_PARAMS, with_payload=False)
+                for vector in vectors
+            ]
+
+            start_time = time.perf_counter()
+            responses = self.qdrant_client.query_batch_points(
+                collection_name=COLLECTION_NAME,
+                requests=requests
+            )
+            end_time = time.perf_counter()
+
+            return (end_time - start_time) * 1000, [len(response.points) for response in responses]  # en ms
         except Exception as e:
             st.error(f"Erreur lors de la mesure Qdrant: {e}")
-            return 0, 0
+            return 0, [0] * len(vectors)
 
     def measure_neo4j_query_time(self, query_func, *args) -> Tuple[float, int]:
         """Mesure le temps d'exécution d'une requête Neo4j"""
         try:
-            start_time = time.time()
+            start_time = time.perf_counter()
             results = query_func(*args)
-            end_time = time.time()
+            end_time = time.perf_counter()
 
             return (end_time - start_time) * 1000, len(results)  # en ms
         except Exception as e:
@@ -125,11 +243,7 @@ def render_dashboard(qdrant_client, neo4j_querier, vector_store):
     """Affiche le dashboard complet des métriques"""
 
     st.markdown("### 📊 Dashboard de Performance")
-    st.markdown("""
-        <div style='background: rgba(16, 185, 129, 0.1); padding: 1rem; border-radius: 8px; border-left: 4px solid #10b981; margin-bottom: 1.5rem;'>
-            📈 Métriques en temps réel du système RAG Hybride - Surveillance Qdrant et Neo4j
-        </div>
-    """, unsafe_allow_html=True)
+    st.success("📈 Métriques en temps réel du système RAG Hybride - Surveillance Qdrant et Neo4j")
 
     # Initialiser le dashboard
     dashboard = DashboardMetrics(qdrant_client, neo4j_querier, vector_store)
@@ -138,28 +252,91 @@ def render_dashboard(qdrant_client, neo4j_querier, vector_store):
     col1, col2, col3 = st.columns([1, 1, 4])
     with col1:
         if st.button("🔄 Rafraîchir", use_container_width=True):
-            st.rerun()
+            # Forcer une nouvelle lecture des métriques, sans attendre l'expiration du cache.
+            # Le clic relance déjà le script: les sections plus bas relisent les métriques
+            # dans ce même passage, sans second st.rerun()
+            _fetch_qdrant_metrics.clear()
+            _count_collections.clear()
+            _fetch_neo4j_metrics.clear()
     with col2:
         auto_refresh = st.checkbox("Auto-refresh", value=False)
 
     if auto_refresh:
-        st.markdown("""
-            <div style='background: rgba(59, 130, 246, 0.15); padding: 0.75rem; border-radius: 8px; border-left: 3px solid #3b82f6; margin: 0.5rem 0;'>
-                ⏱️ <strong>Rafraîchissement automatique activé</strong> (toutes les 5 secondes)
-            </div>
-        """, unsafe_allow_html=True)
+        st.info(f"⏱️ **Rafraîchissement automatique activé** (toutes les {METRICS_TTL} secondes)")
 
     st.markdown("---")
 
-    # Section 1: Métriques Qdrant
+    run_every = METRICS_TTL if auto_refresh else None
+
+    # Chaque section est un fragment: elle se rafraîchit seule (auto-refresh, boutons de test)
+    # sans relancer tout le script
+    st.fragment(_render_qdrant_section, run_every=run_every)(dashboard)
+    st.markdown("---")
+    st.fragment(_render_neo4j_section, run_every=run_every)(dashboard)
+    st.markdown("---")
+    st.fragment(_render_status_section, run_every=run_every)(dashboard)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _distribution_frame(counts: Tuple[Tuple[str, int], ...]) -> pd.DataFrame:
+    """
+    DataFrame d'un graphique de distribution, mis en cache par contenu:
+    des comptages inchangés réutilisent la même table sans la reconstruire
+    """
+    types, values = zip(*counts)
+    return pd.DataFrame(
+        {"Nombre": pd.Series(values, dtype="int64")},
+        index=pd.Index(types, name="Type")
+    )
+
+
+def _record_probe_samples(history_key: str, samples: Dict[str, float]):
+    """Ajoute un échantillon (ms) par sonde à l'historique glissant de la session"""
+    history = st.session_state.setdefault(history_key, {})
+    for label, time_ms in samples.items():
+        history.setdefault(label, deque(maxlen=PROBE_HISTORY_SIZE)).append(time_ms)
+
+
+def _render_probe_history(history_key: str):
+    """Affiche moyenne et p95 glissants calculés en mémoire, sans nouvel appel aux bases"""
+    history = st.session_state.get(history_key)
+    if not history:
+        return
+
+    labels = list(history)
+    samples = [np.fromiter(history[label], dtype=np.float64) for label in labels]
+    df = pd.DataFrame({
+        "Sonde": labels,
+        "Échantillons": pd.Series([len(s) for s in samples], dtype="int32"),
+        "Moyenne (ms)": pd.Series([s.mean() for s in samples], dtype="float32").round(2),
+        "p95 (ms)": pd.Series([np.percentile(s, 95) for s in samples], dtype="float32").round(2)
+    })
+
+    st.markdown(f"**📈 Historique glissant ({PROBE_HISTORY_SIZE} derniers échantillons):**")
+    st.dataframe(df.set_index("Sonde"), use_container_width=True)
+
+
+def _render_probe_buttons(run_label: str, key: str, history_key: str) -> bool:
+    """Boutons de lancement d'un échantillon et d'effacement de l'historique"""
+    col_run, col_clear = st.columns([1, 1])
+    with col_run:
+        run = st.button(run_label, key=key, use_container_width=False)
+    with col_clear:
+        if st.button("🗑️ Effacer l'historique", key=f"{key}_clear", use_container_width=False):
+            st.session_state.pop(history_key, None)
+    return run
+
+
+def _render_qdrant_section(dashboard: DashboardMetrics):
+    """Section 1: métriques et test de performance Qdrant"""
     st.markdown("### 🔵 Qdrant - Base Vectorielle")
-    st.markdown("""
-        <div style='background: rgba(59, 130, 246, 0.1); padding: 0.75rem; border-radius: 8px; margin-bottom: 1rem;'>
-            Statistiques de la base de données vectorielle
-        </div>
-    """, unsafe_allow_html=True)
+    st.caption("Statistiques de la base de données vectorielle")
 
+    # Squelette affiché pendant la récupération des métriques
+    skeleton = st.empty()
+    skeleton.caption("⏳ Chargement des métriques Qdrant...")
     qdrant_metrics = dashboard.get_qdrant_metrics()
+    skeleton.empty()
 
     if "error" not in qdrant_metrics:
         col1, col2, col3, col4 = st.columns(4)
@@ -206,47 +383,43 @@ def render_dashboard(qdrant_client, neo4j_querier, vector_store):
             "Événements festivals"
         ]
 
-        if st.button("▶️ Lancer test Qdrant", key="test_qdrant", use_container_width=False):
+        # Chaque clic ajoute un échantillon; les statistiques viennent de l'historique
+        if _render_probe_buttons("▶️ Lancer test Qdrant", "test_qdrant", "qdrant_probe_hist"):
             with st.spinner("⏳ Test en cours..."):
-                perf_data = []
+                # Toutes les questions en une seule requête groupée
+                total_ms, results_counts = dashboard.measure_qdrant_batch_search_time(test_questions)
 
-                for question in test_questions:
-                    time_ms, results_count = dashboard.measure_qdrant_search_time(question)
-                    perf_data.append({
-                        "Question": question[:30] + "...",
-                        "Temps (ms)": round(time_ms, 2),
-                        "Résultats": results_count
-                    })
-
-                df = pd.DataFrame(perf_data)
+                df = pd.DataFrame({
+                    "Question": [question[:30] + "..." for question in test_questions],
+                    "Résultats": pd.Series(results_counts, dtype="int32")
+                })
 
                 # Afficher le tableau avec style
                 st.markdown("**📋 Résultats des tests:**")
                 st.dataframe(df, use_container_width=True)
 
-                # Graphique des temps
-                st.markdown("**📊 Temps de réponse par question:**")
-                st.bar_chart(df.set_index("Question")["Temps (ms)"])
+                # Temps total du lot et moyenne par question
+                avg_time = total_ms / len(test_questions)
+                st.metric(
+                    label="⏱️ Temps moyen de recherche",
+                    value=f"{avg_time:.2f} ms",
+                    help=f"Requête groupée de {len(test_questions)} questions: {total_ms:.2f} ms"
+                )
+                _record_probe_samples("qdrant_probe_hist", {"Recherche (moyenne par question)": avg_time})
 
-                # Moyenne
-                avg_time = df["Temps (ms)"].mean()
-                st.markdown(f"""
-                    <div style='background: rgba(16, 185, 129, 0.15); padding: 1rem; border-radius: 8px; border-left: 4px solid #10b981; margin: 1rem 0;'>
-                        ⏱️ <strong>Temps moyen de recherche:</strong> <span style='font-size: 1.2rem; color: #10b981;'>{avg_time:.2f} ms</span>
-                    </div>
-                """, unsafe_allow_html=True)
+        _render_probe_history("qdrant_probe_hist")
 
-    st.markdown("---")
 
-    # Section 2: Métriques Neo4j
+def _render_neo4j_section(dashboard: DashboardMetrics):
+    """Section 2: métriques et test de performance Neo4j"""
     st.markdown("### 🟢 Neo4j - Graphe de Connaissances")
-    st.markdown("""
-        <div style='background: rgba(16, 185, 129, 0.1); padding: 0.75rem; border-radius: 8px; margin-bottom: 1rem;'>
-            Statistiques de la base de données graphique
-        </div>
-    """, unsafe_allow_html=True)
+    st.caption("Statistiques de la base de données graphique")
 
+    # Squelette affiché pendant la récupération des métriques
+    skeleton = st.empty()
+    skeleton.caption("⏳ Chargement des métriques Neo4j...")
     neo4j_metrics = dashboard.get_neo4j_metrics()
+    skeleton.empty()
 
     if "error" not in neo4j_metrics:
         col1, col2 = st.columns(2)
@@ -276,11 +449,7 @@ def render_dashboard(qdrant_client, neo4j_querier, vector_store):
             st.markdown("**🔘 Nœuds par type**")
             nodes_data = neo4j_metrics.get("nodes_by_type", {})
             if nodes_data:
-                df_nodes = pd.DataFrame({
-                    "Type": list(nodes_data.keys()),
-                    "Nombre": list(nodes_data.values())
-                })
-                st.bar_chart(df_nodes.set_index("Type"), height=300)
+                st.bar_chart(_distribution_frame(tuple(sorted(nodes_data.items()))), height=300)
             else:
                 st.info("Aucun nœud trouvé")
 
@@ -288,11 +457,7 @@ def render_dashboard(qdrant_client, neo4j_querier, vector_store):
             st.markdown("**🔗 Relations par type**")
             relations_data = neo4j_metrics.get("relations_by_type", {})
             if relations_data:
-                df_relations = pd.DataFrame({
-                    "Type": list(relations_data.keys()),
-                    "Nombre": list(relations_data.values())
-                })
-                st.bar_chart(df_relations.set_index("Type"), height=300)
+                st.bar_chart(_distribution_frame(tuple(sorted(relations_data.items()))), height=300)
             else:
                 st.info("Aucune relation trouvée")
 
@@ -300,52 +465,40 @@ def render_dashboard(qdrant_client, neo4j_querier, vector_store):
         st.markdown("")
         st.markdown("#### 🚀 Test de performance des requêtes")
 
-        if st.button("▶️ Lancer test Neo4j", key="test_neo4j", use_container_width=False):
+        if _render_probe_buttons("▶️ Lancer test Neo4j", "test_neo4j", "neo4j_probe_hist"):
             with st.spinner("⏳ Test en cours..."):
-                perf_data = []
-
-                # Test 1: Requête simple
-                time_ms, results_count = dashboard.measure_neo4j_query_time(
-                    neo4j_querier.query_top_revenue_tradeshows, 5
-                )
-                perf_data.append({
-                    "Requête": "Top salons (simple)",
-                    "Temps (ms)": round(time_ms, 2),
-                    "Résultats": results_count
-                })
-
-                # Test 2: Requête multi-hop
-                time_ms, results_count = dashboard.measure_neo4j_query_time(
-                    neo4j_querier.query_events_with_products_sold_at_tradeshows
-                )
-                perf_data.append({
-                    "Requête": "Événements multi-hop",
-                    "Temps (ms)": round(time_ms, 2),
-                    "Résultats": results_count
-                })
-
-                # Test 3: Agrégation
-                time_ms, results_count = dashboard.measure_neo4j_query_time(
-                    neo4j_querier.query_tradeshows_sales_by_customer_type, "collectivites"
-                )
-                perf_data.append({
-                    "Requête": "Agrégation ventes",
-                    "Temps (ms)": round(time_ms, 2),
-                    "Résultats": results_count
+                probes = [
+                    # Test 1: Requête simple
+                    ("Top salons (simple)", dashboard.neo4j_querier.query_top_revenue_tradeshows, (5,)),
+                    # Test 2: Requête multi-hop
+                    ("Événements multi-hop", dashboard.neo4j_querier.query_events_with_products_sold_at_tradeshows, ()),
+                    # Test 3: Agrégation
+                    ("Agrégation ventes", dashboard.neo4j_querier.query_tradeshows_sales_by_customer_type, ("collectivites",)),
+                    # Test 4: R&D multi-hop
+                    ("R&D festivals (3 sauts)", dashboard.neo4j_querier.query_rd_projects_for_festival_products, ()),
+                ]
+
+                # Requêtes lancées en parallèle: le driver est thread-safe, chaque requête
+                # ouvre sa propre session sur le pool de connexions
+                ctx = get_script_run_ctx()
+                with ThreadPoolExecutor(
+                    max_workers=len(probes),
+                    initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+                ) as executor:
+                    futures = [
+                        executor.submit(dashboard.measure_neo4j_query_time, query_func, *args)
+                        for _, query_func, args in probes
+                    ]
+                    timings = [future.result() for future in futures]
+
+                # Construction par colonnes, types explicites (pas d'inférence ligne à ligne)
+                times_ms, results_counts = zip(*timings)
+                df = pd.DataFrame({
+                    "Requête": [label for label, _, _ in probes],
+                    "Temps (ms)": pd.Series(times_ms, dtype="float32").round(2),
+                    "Résultats": pd.Series(results_counts, dtype="int32")
                 })
 
-                # Test 4: R&D multi-hop
-                time_ms, results_count = dashboard.measure_neo4j_query_time(
-                    neo4j_querier.query_rd_projects_for_festival_products
-                )
-                perf_data.append({
-                    "Requête": "R&D festivals (3 sauts)",
-                    "Temps (ms)": round(time_ms, 2),
-                    "Résultats": results_count
-                })
-
-                df = pd.DataFrame(perf_data)
-
                 # Afficher le tableau avec style
                 st.markdown("**📋 Résultats des tests:**")
                 st.dataframe(df, use_container_width=True)
@@ -356,87 +509,35 @@ def render_dashboard(qdrant_client, neo4j_querier, vector_store):
 
                 # Moyenne
                 avg_time = df["Temps (ms)"].mean()
-                st.markdown(f"""
-                    <div style='background: rgba(16, 185, 129, 0.15); padding: 1rem; border-radius: 8px; border-left: 4px solid #10b981; margin: 1rem 0;'>
-                        ⏱️ <strong>Temps moyen de requête:</strong> <span style='font-size: 1.2rem; color: #10b981;'>{avg_time:.2f} ms</span>
-                    </div>
-                """, unsafe_allow_html=True)
+                st.metric(label="⏱️ Temps moyen de requête", value=f"{avg_time:.2f} ms")
+                _record_probe_samples(
+                    "neo4j_probe_hist",
+                    {label: float(time_ms) for label, time_ms in zip(df["Requête"], times_ms)}
+                )
+
+        _render_probe_history("neo4j_probe_hist")
 
-    st.markdown("---")
 
-    # Section 3: État du système
+def _render_status_section(dashboard: DashboardMetrics):
+    """Section 3: état du système"""
     st.markdown("### 🔧 État du Système")
-    st.markdown("""
-        <div style='background: rgba(100, 116, 139, 0.1); padding: 0.75rem; border-radius: 8px; margin-bottom: 1rem;'>
-            Statut opérationnel des composants
-        </div>
-    """, unsafe_allow_html=True)
+    st.caption("Statut opérationnel des composants")
 
-    col1, col2, col3 = st.columns(3)
+    # Lecture depuis le cache des métriques; les erreurs sont déjà affichées dans leur section
+    qdrant_metrics = dashboard.get_qdrant_metrics(show_errors=False)
+    neo4j_metrics = dashboard.get_neo4j_metrics(show_errors=False)
 
-    with col1:
-        if "error" not in qdrant_metrics:
-            st.markdown("""
-                <div style='background: rgba(16, 185, 129, 0.15); padding: 1rem; border-radius: 8px; text-align: center; border: 2px solid #10b981;'>
-                    <div style='font-size: 2rem;'>🟢</div>
-                    <strong>Qdrant</strong><br>
-                    <span style='color: #10b981; font-weight: 600;'>Opérationnel</span>
-                </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown("""
-                <div style='background: rgba(239, 68, 68, 0.15); padding: 1rem; border-radius: 8px; text-align: center; border: 2px solid #ef4444;'>
-                    <div style='font-size: 2rem;'>🔴</div>
-                    <strong>Qdrant</strong><br>
-                    <span style='color: #ef4444; font-weight: 600;'>Erreur</span>
-                </div>
-            """, unsafe_allow_html=True)
+    qdrant_ok = "error" not in qdrant_metrics
+    neo4j_ok = "error" not in neo4j_metrics
 
-    with col2:
-        if "error" not in neo4j_metrics:
-            st.markdown("""
-                <div style='background: rgba(16, 185, 129, 0.15); padding: 1rem; border-radius: 8px; text-align: center; border: 2px solid #10b981;'>
-                    <div style='font-size: 2rem;'>🟢</div>
-                    <strong>Neo4j</strong><br>
-                    <span style='color: #10b981; font-weight: 600;'>Opérationnel</span>
-                </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown("""
-                <div style='background: rgba(239, 68, 68, 0.15); padding: 1rem; border-radius: 8px; text-align: center; border: 2px solid #ef4444;'>
-                    <div style='font-size: 2rem;'>🔴</div>
-                    <strong>Neo4j</strong><br>
-                    <span style='color: #ef4444; font-weight: 600;'>Erreur</span>
-                </div>
-            """, unsafe_allow_html=True)
-
-    with col3:
-        if "error" not in qdrant_metrics and "error" not in neo4j_metrics:
-            st.markdown("""
-                <div style='background: rgba(16, 185, 129, 0.15); padding: 1rem; border-radius: 8px; text-align: center; border: 2px solid #10b981;'>
-                    <div style='font-size: 2rem;'>✅</div>
-                    <strong>Système Global</strong><br>
-                    <span style='color: #10b981; font-weight: 600;'>Tout fonctionne</span>
-                </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown("""
-                <div style='background: rgba(239, 68, 68, 0.15); padding: 1rem; border-radius: 8px; text-align: center; border: 2px solid #ef4444;'>
-                    <div style='font-size: 2rem;'>⚠️</div>
-                    <strong>Système Global</strong><br>
-                    <span style='color: #ef4444; font-weight: 600;'>Problème détecté</span>
-                </div>
-            """, unsafe_allow_html=True)
-
-    # Timestamp avec style
-    st.markdown("")
-    st.markdown(f"""
-        <div style='background: rgba(100, 116, 139, 0.1); padding: 0.75rem; border-radius: 8px; text-align: center; margin-top: 1rem;'>
-            🕒 <strong>Dernière mise à jour:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        </div>
-    """, unsafe_allow_html=True)
-
-    # Auto-refresh
-    if auto_refresh:
-        time.sleep(5)
-        st.rerun()
+    status_df = pd.DataFrame({
+        "Composant": ["Qdrant", "Neo4j", "Système Global"],
+        "Statut": [
+            "🟢 Opérationnel" if qdrant_ok else "🔴 Erreur",
+            "🟢 Opérationnel" if neo4j_ok else "🔴 Erreur",
+            "✅ Tout fonctionne" if qdrant_ok and neo4j_ok else "⚠️ Problème détecté"
+        ]
+    })
+    st.dataframe(status_df, hide_index=True, use_container_width=True)
+
+    st.caption(f"🕒 Dernière mise à jour: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
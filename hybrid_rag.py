@@ -1,13 +1,213 @@
+import asyncio
 import os
+from functools import lru_cache
+import ahocorasick
 from dotenv import load_dotenv
 from langchain_mistralai import ChatMistralAI
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    MatchValue,
+    QuantizationSearchParams,
+    QueryRequest,
+    SearchParams,
+)
 
 from neo4j_query import Neo4jQuerier
 
 load_dotenv()
 
+# Recherche sur les vecteurs quantifiés puis rescoring des meilleurs candidats
+SEARCH_PARAMS = SearchParams(
+    quantization=QuantizationSearchParams(rescore=True, oversampling=2.0)
+)
+
+# Prompts compilés une seule fois au chargement du module.
+# Consignes statiques en message système (préfixe identique d'un appel à l'autre),
+# contextes et question en message utilisateur
+HYBRID_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """Assistant expert GreenPower Solutions (générateurs solaires autonomes).
+Réponds avec CONTEXTE GRAPHE pour les relations et agrégations (qui, où, combien, total)
+et CONTEXTE VECTORIEL pour les descriptions et spécifications.
+Information absente des contextes: dis que tu ne sais pas, n'invente rien."""),
+    ("human", """CONTEXTE VECTORIEL:
+{vector_context}
+
+CONTEXTE GRAPHE:
+{graph_context}
+
+QUESTION: {question}"""),
+])
+
+SIMPLE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """Réponds uniquement à partir du CONTEXTE fourni.
+Information absente du CONTEXTE: dis que tu ne sais pas, n'invente rien."""),
+    ("human", """CONTEXTE:
+{context}
+
+QUESTION: {question}"""),
+])
+
+# Mots-clés des questions multi-hop (questions relationnelles/agrégations)
+MULTI_HOP_KEYWORDS = (
+    # Relations
+    "quels événements", "quels salons", "où", "qui",
+    "liste", "lister", "tous les", "combien",
+    # Agrégations
+    "total", "somme", "moyenne", "maximum", "minimum",
+    "économisé", "co2", "carbone",
+    # Patterns multi-hop
+    "vendus à", "utilisés aux", "déployés à", "présentés à",
+    "projets r&d", "recherche", "développement",
+    # Customer types
+    "collectivités", "entreprises", "particuliers",
+    # Liens produit-événement
+    "festival", "salon", "avec", "par"
+)
+
+# Questions simples: description, spécifications, prix
+SIMPLE_KEYWORDS = (
+    "qu'est-ce que", "c'est quoi", "décris", "describe",
+    "caractéristiques", "specifications", "prix", "coût",
+    "comment fonctionne", "fonctionnement",
+    "garantie", "warranty", "maintenance"
+)
+
+
+# Domaines des documents, étiquetés à l'indexation (payload metadata.doc_type)
+# et déduits de la question pour restreindre la recherche vectorielle
+DOMAIN_KEYWORDS = {
+    "pricing": ("prix", "coût", "tarif", "€", "marge", "location"),
+    "specs": (
+        "caractéristiques", "spécifications", "specifications", "batterie",
+        "capacité", "puissance", "panneau", "garantie", "maintenance"
+    ),
+    "events": ("événement", "salon", "festival", "concert", "pollutec", "exposition"),
+}
+
+# Nombre de documents récupérés par recherche vectorielle
+RETRIEVER_K = 3
+# Filtrage de la recherche par domaine (0 pour chercher toujours dans toute la collection)
+DOMAIN_FILTER = os.getenv("DOMAIN_FILTER", "1") == "1"
+
+
+def _build_keyword_automaton(keywords_by_category):
+    """Automate Aho-Corasick des mots-clés, chacun étiqueté avec sa catégorie"""
+    automaton = ahocorasick.Automaton()
+    for category, keywords in keywords_by_category.items():
+        for keyword in keywords:
+            automaton.add_word(keyword, (category, keyword))
+    automaton.make_automaton()
+    return automaton
+
+
+KEYWORD_AUTOMATON = _build_keyword_automaton({"multi_hop": MULTI_HOP_KEYWORDS, "simple": SIMPLE_KEYWORDS})
+DOMAIN_AUTOMATON = _build_keyword_automaton(DOMAIN_KEYWORDS)
+
+
+def classify_domain(text):
+    """
+    Domaine dominant d'un texte (question ou chunk): le plus de mots-clés distincts.
+    Retourne None si aucun mot-clé ou en cas d'égalité.
+    """
+    scores = {}
+    for category, _ in {match for _, match in DOMAIN_AUTOMATON.iter(text.lower())}:
+        scores[category] = scores.get(category, 0) + 1
+    if not scores:
+        return None
+    ranked = sorted(scores.values(), reverse=True)
+    if len(ranked) > 1 and ranked[0] == ranked[1]:
+        return None
+    return max(scores, key=scores.get)
+
+
+@lru_cache(maxsize=1024)
+def _classify(question_lower):
+    """Classification mise en cache: une question répétée ne refait pas le scan des mots-clés"""
+    # Un seul passage sur la question; chaque mot-clé présent compte une fois
+    matched = {match for _, match in KEYWORD_AUTOMATON.iter(question_lower)}
+    multi_hop_score = sum(1 for category, _ in matched if category == "multi_hop")
+    simple_score = len(matched) - multi_hop_score
+
+    # Decision
+    if multi_hop_score > simple_score:
+        return "multi_hop"
+    else:
+        return "simple"
+
+
+def _domain_filter(domain):
+    return Filter(must=[FieldCondition(key="metadata.doc_type", match=MatchValue(value=domain))])
+
+
+@lru_cache(maxsize=256)
+def _retrieve(vector_store, question):
+    """
+    Recherche vectorielle mise en cache par (vector store, question): une question
+    répétée ne refait ni l'embedding ni la recherche. Un nouveau vector store
+    (collection réindexée) invalide naturellement les entrées.
+
+    Si la question relève d'un domaine, la recherche est d'abord restreinte aux chunks
+    de ce domaine; elle est refaite sur toute la collection (même embedding) si le
+    filtre ne ramène pas assez de documents (chunks non étiquetés, domaine trop étroit).
+    """
+    vector = vector_store.embeddings.embed_query(question)
+    domain = classify_domain(question) if DOMAIN_FILTER else None
+    if domain is not None:
+        docs = vector_store.similarity_search_by_vector(
+            vector,
+            k=RETRIEVER_K,
+            filter=_domain_filter(domain),
+            search_params=SEARCH_PARAMS
+        )
+        if len(docs) >= RETRIEVER_K:
+            return tuple(docs)
+    return tuple(vector_store.similarity_search_by_vector(vector, k=RETRIEVER_K, search_params=SEARCH_PARAMS))
+
+
+def _retrieve_batch(vector_store, questions):
+    """
+    Recherche vectorielle de plusieurs questions: un seul appel d'embedding pour toutes
+    les questions et une seule requête Qdrant groupée (plus une seconde, sans filtre,
+    pour les questions dont le filtre de domaine ramène trop peu de documents).
+    """
+    vectors = vector_store.embeddings.embed_documents(list(questions))
+    domains = [classify_domain(question) if DOMAIN_FILTER else None for question in questions]
+
+    def search(indices, filtered):
+        if not indices:
+            return {}
+        responses = vector_store.client.query_batch_points(
+            collection_name=vector_store.collection_name,
+            requests=[
+                QueryRequest(
+                    query=vectors[i],
+                    filter=_domain_filter(domains[i]) if filtered else None,
+                    limit=RETRIEVER_K,
+                    params=SEARCH_PARAMS,
+                    with_payload=True
+                )
+                for i in indices
+            ]
+        )
+        return {
+            i: [
+                Document(page_content=point.payload["page_content"], metadata=point.payload.get("metadata") or {})
+                for point in response.points
+            ]
+            for i, response in zip(indices, responses)
+        }
+
+    results = search([i for i, domain in enumerate(domains) if domain is not None], filtered=True)
+    missing = [i for i in range(len(questions)) if len(results.get(i, ())) < RETRIEVER_K]
+    if missing:
+        results.update(search(missing, filtered=False))
+    return [results[i] for i in range(len(questions))]
+
+
 class HybridRAG:
     """
     Routeur intelligent qui décide d'utiliser:
@@ -15,13 +215,17 @@ class HybridRAG:
     - RAG hybride (Qdrant + Neo4j) pour questions relationnelles/multi-hop
     """
 
-    def __init__(self):
-        self.llm = ChatMistralAI(
+    def __init__(self, neo4j_driver=None, llm=None):
+        # LLM partagé (même client HTTP) si fourni, sinon client dédié
+        self.llm = llm or ChatMistralAI(
             model="mistral-small-latest",
             mistral_api_key=os.getenv("MISTRAL_API_KEY"),
             temperature=0
         )
-        self.neo4j_querier = Neo4jQuerier()
+        self.neo4j_querier = Neo4jQuerier(neo4j_driver)
+        # Chaînes construites une fois par instance
+        self.hybrid_chain = HYBRID_PROMPT | self.llm | StrOutputParser()
+        self.simple_chain = SIMPLE_PROMPT | self.llm | StrOutputParser()
 
     def close(self):
         self.neo4j_querier.close()
@@ -31,88 +235,38 @@ class HybridRAG:
         Classifie la question pour déterminer la stratégie RAG appropriée.
         Retourne: "simple" ou "multi_hop"
         """
-        # Keywords pour multi-hop (questions relationnelles/agrégations)
-        multi_hop_keywords = [
-            # Relations
-            "quels événements", "quels salons", "où", "qui",
-            "liste", "lister", "tous les", "combien",
-            # Agrégations
-            "total", "somme", "moyenne", "maximum", "minimum",
-            "économisé", "co2", "carbone",
-            # Patterns multi-hop
-            "vendus à", "utilisés aux", "déployés à", "présentés à",
-            "projets r&d", "recherche", "développement",
-            # Customer types
-            "collectivités", "entreprises", "particuliers",
-            # Liens produit-événement
-            "festival", "salon", "avec", "par"
-        ]
-
-        question_lower = question.lower()
-
-        # Check for multi-hop patterns
-        multi_hop_score = sum(1 for keyword in multi_hop_keywords if keyword in question_lower)
-
-        # Questions simples: description, spécifications, prix
-        simple_keywords = [
-            "qu'est-ce que", "c'est quoi", "décris", "describe",
-            "caractéristiques", "specifications", "prix", "coût",
-            "comment fonctionne", "fonctionnement",
-            "garantie", "warranty", "maintenance"
-        ]
-
-        simple_score = sum(1 for keyword in simple_keywords if keyword in question_lower)
-
-        # Decision
-        if multi_hop_score > simple_score:
-            return "multi_hop"
-        else:
-            return "simple"
+        return _classify(question.lower())
 
-    def query_hybrid(self, question, vector_store):
+    async def _retrieve_hybrid(self, question, vector_store):
+        """
+        Lance les deux récupérations (indépendantes) en même temps:
+        la latence totale est celle de la plus lente au lieu de leur somme
+        """
+        graph_context_raw, vector_docs = await asyncio.gather(
+            asyncio.to_thread(self.neo4j_querier.get_graph_context_for_question, question),
+            asyncio.to_thread(_retrieve, vector_store, question)
+        )
+        return graph_context_raw, list(vector_docs)
+
+    def query_hybrid(self, question, vector_store, stream=False):
         """
         RAG Hybride: Combine Qdrant (similarité sémantique) + Neo4j (relations)
+
+        Avec stream=True, la récupération est faite immédiatement et "answer" est
+        un itérateur des tokens générés par le LLM.
         """
-        # 1. Récupérer le contexte du graphe Neo4j
-        graph_context_raw = self.neo4j_querier.get_graph_context_for_question(question)
+        # 1-2. Contexte du graphe Neo4j et contexte vectoriel Qdrant récupérés en parallèle
+        graph_context_raw, vector_docs = asyncio.run(self._retrieve_hybrid(question, vector_store))
         graph_context = self.neo4j_querier.format_graph_context(graph_context_raw)
-
-        # 2. Récupérer le contexte vectoriel de Qdrant
-        retriever = vector_store.as_retriever(search_kwargs={"k": 3})
-        vector_docs = retriever.invoke(question)
         vector_context = "\n\n".join([doc.page_content for doc in vector_docs])
 
-        # 3. Créer un prompt enrichi avec les deux contextes
-        template = """Tu es un assistant expert sur GreenPower Solutions et leurs produits solaires autonomes.
-
-Tu dois répondre à la question en utilisant DEUX sources de contexte:
-
-1. CONTEXTE VECTORIEL (descriptions détaillées, documents):
-{vector_context}
-
-2. CONTEXTE GRAPHE (relations, agrégations, connexions):
-{graph_context}
-
-Utilise prioritairement le CONTEXTE GRAPHE pour les informations relationnelles (qui, où, combien, total, etc.)
-et le CONTEXTE VECTORIEL pour les descriptions détaillées et spécifications.
-
-Si une information n'est pas présente dans les contextes, dis clairement que tu ne sais pas.
-Ne fabrique pas de réponses.
-
-QUESTION: {question}
-
-RÉPONSE:"""
-
-        prompt = ChatPromptTemplate.from_template(template)
-
-        # 4. Générer la réponse
-        chain = prompt | self.llm | StrOutputParser()
-
-        answer = chain.invoke({
+        # 3. Générer la réponse à partir du prompt enrichi avec les deux contextes
+        inputs = {
             "question": question,
             "vector_context": vector_context,
             "graph_context": graph_context if graph_context else "Aucune information relationnelle trouvée."
-        })
+        }
+        answer = self.hybrid_chain.stream(inputs) if stream else self.hybrid_chain.invoke(inputs)
 
         return {
             "answer": answer,
@@ -123,32 +277,20 @@ RÉPONSE:"""
             "strategy": "hybrid"
         }
 
-    def query_simple(self, question, vector_store):
+    def query_simple(self, question, vector_store, stream=False):
         """
         RAG Simple: Utilise seulement Qdrant (similarité vectorielle)
+
+        Avec stream=True, "answer" est un itérateur des tokens générés par le LLM.
         """
-        retriever = vector_store.as_retriever(search_kwargs={"k": 3})
-        vector_docs = retriever.invoke(question)
+        vector_docs = list(_retrieve(vector_store, question))
         vector_context = "\n\n".join([doc.page_content for doc in vector_docs])
 
-        template = """Tu dois répondre UNIQUEMENT à partir des informations fournies dans le CONTEXTE ci-dessous.
-Si une information n'est pas présente dans le CONTEXTE, dis clairement que tu ne sais pas.
-Ne fabrique pas de réponses.
-
-CONTEXTE:
-{context}
-
-QUESTION: {question}
-
-RÉPONSE:"""
-
-        prompt = ChatPromptTemplate.from_template(template)
-        chain = prompt | self.llm | StrOutputParser()
-
-        answer = chain.invoke({
+        inputs = {
             "question": question,
             "context": vector_context
-        })
+        }
+        answer = self.simple_chain.stream(inputs) if stream else self.simple_chain.invoke(inputs)
 
         return {
             "answer": answer,
@@ -158,7 +300,7 @@ RÉPONSE:"""
             "strategy": "simple"
         }
 
-    def query(self, question, vector_store, force_strategy=None):
+    def query(self, question, vector_store, force_strategy=None, stream=False):
         """
         Point d'entrée principal avec routage intelligent.
 
@@ -166,6 +308,7 @@ RÉPONSE:"""
             question: La question de l'utilisateur
             vector_store: Le vector store Qdrant
             force_strategy: "simple", "multi_hop", ou None (auto)
+            stream: si True, "answer" est un itérateur de tokens
 
         Returns:
             dict avec answer, sources, strategy
@@ -178,9 +321,64 @@ RÉPONSE:"""
 
         # Router vers la bonne méthode
         if strategy == "multi_hop":
-            return self.query_hybrid(question, vector_store)
+            return self.query_hybrid(question, vector_store, stream)
         else:
-            return self.query_simple(question, vector_store)
+            return self.query_simple(question, vector_store, stream)
+
+    async def _graph_contexts(self, questions):
+        """Contextes Neo4j de plusieurs questions, récupérés en parallèle"""
+        return await asyncio.gather(*(
+            asyncio.to_thread(self.neo4j_querier.get_graph_context_for_question, question)
+            for question in questions
+        ))
+
+    def query_batch(self, questions, vector_store):
+        """
+        Répond à plusieurs questions (évaluation, QueryExamples) en groupant les appels:
+        un seul embedding et une recherche Qdrant groupée pour toutes les questions,
+        les contextes Neo4j des questions multi-hop en parallèle, puis les générations
+        lancées en concurrence (chain.batch).
+
+        Returns:
+            liste de dict avec answer, sources, strategy (dans l'ordre des questions)
+        """
+        strategies = [self.classify_question(question) for question in questions]
+        docs_per_question = _retrieve_batch(vector_store, questions)
+        multi_hop = [i for i, strategy in enumerate(strategies) if strategy == "multi_hop"]
+        graph_contexts = dict(zip(
+            multi_hop,
+            asyncio.run(self._graph_contexts([questions[i] for i in multi_hop]))
+        ))
+
+        results = []
+        for i, (question, vector_docs) in enumerate(zip(questions, docs_per_question)):
+            vector_context = "\n\n".join([doc.page_content for doc in vector_docs])
+            if i in graph_contexts:
+                graph_context = self.neo4j_querier.format_graph_context(graph_contexts[i])
+                results.append({
+                    "inputs": {
+                        "question": question,
+                        "vector_context": vector_context,
+                        "graph_context": graph_context if graph_context else "Aucune information relationnelle trouvée."
+                    },
+                    "sources": {"vector_docs": vector_docs, "graph_context": graph_contexts[i]},
+                    "strategy": "hybrid"
+                })
+            else:
+                results.append({
+                    "inputs": {"question": question, "context": vector_context},
+                    "sources": {"vector_docs": vector_docs},
+                    "strategy": "simple"
+                })
+
+        for strategy, chain in (("hybrid", self.hybrid_chain), ("simple", self.simple_chain)):
+            group = [result for result in results if result["strategy"] == strategy]
+            if group:
+                answers = chain.batch([result.pop("inputs") for result in group])
+                for result, answer in zip(group, answers):
+                    result["answer"] = answer
+
+        return results
 
     def explain_routing(self, question):
         """
@@ -85,6 +85,8 @@ def load_neo4j_data():
                 print(f"ℹ️  {count} nœuds déjà présents dans Neo4j")
                 response = input("Voulez-vous recharger les données? (o/N): ").lower()
                 if response != 'o':
+                    # Graphe existant: compléter les propriétés ajoutées depuis son chargement
+                    loader.migrate(session)
                     print("✅ Utilisation des données existantes")
                     loader.close()
                     return True
@@ -1,305 +1,510 @@
+import hashlib
 import os
-import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+import orjson
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
 
+from neo4j_query import NEO4J_DRIVER_OPTIONS
+
 load_dotenv()
 
+# Base explicite: évite la résolution de la base par défaut à chaque session
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or "neo4j"
+
+PRODUCTS_FILE = "data/greenpower_products_enriched.json"
+EVENTS_FILE = "data/greenpower_events_enriched.json"
+RD_FILE = "data/greenpower_rd_innovations.json"
+DATA_FILES = (PRODUCTS_FILE, EVENTS_FILE, RD_FILE)
+
+# Lignes par appel UNWIND: borne la taille des paramètres envoyés au serveur
+UNWIND_BATCH_SIZE = 10_000
+
+# Créer les nœuds Product
+PRODUCTS_QUERY = """
+UNWIND $rows AS row
+MERGE (p:Product {product_id: row.product_id})
+SET p.name = row.name,
+    p.category = row.category,
+    p.category_lower = toLower(row.category),
+    p.continuous_power = row.continuous_power,
+    p.peak_power = row.peak_power,
+    p.battery_capacity = row.battery_capacity,
+    p.battery_type = row.battery_type,
+    p.solar_capacity = row.solar_capacity,
+    p.total_cost = row.total_cost,
+    p.avg_selling_price = row.avg_selling_price,
+    p.margin_percentage = row.margin_percentage,
+    p.co2_reduction = row.co2_reduction,
+    p.rental_available = row.rental_available
+"""
+
+# Créer les nœuds BatteryType et les relations
+BATTERY_TYPES_QUERY = """
+UNWIND $rows AS row
+MERGE (b:BatteryType {type: row.battery_type})
+SET b.type_lower = toLower(row.battery_type)
+WITH b, row
+MATCH (p:Product {product_id: row.product_id})
+MERGE (p)-[:USES_BATTERY]->(b)
+"""
+
+# Créer les nœuds TradeShow
+TRADE_SHOWS_QUERY = """
+UNWIND $rows AS row
+MERGE (t:TradeShow {event_id: row.event_id})
+SET t.name = row.name,
+    t.type = row.type,
+    t.location = row.location,
+    t.location_lower = toLower(row.location),
+    t.date = row.date,
+    t.leads_generated = row.leads_generated,
+    t.total_sales = row.total_sales
+"""
+
+# Créer les relations avec les produits affichés
+DISPLAYED_AT_QUERY = """
+UNWIND $rows AS row
+MATCH (t:TradeShow {event_id: row.event_id})
+MATCH (p:Product {product_id: row.product_id})
+MERGE (p)-[:DISPLAYED_AT]->(t)
+"""
+
+# Créer les nœuds Sale
+SALES_QUERY = """
+UNWIND $rows AS row
+MERGE (s:Sale {sale_id: row.sale_id})
+SET s.customer_type = row.customer_type,
+    s.units = row.units,
+    s.total_revenue = row.total_revenue
+WITH s, row
+MATCH (t:TradeShow {event_id: row.event_id})
+MERGE (s)-[:SOLD_AT]->(t)
+"""
+
+# Lier les produits vendus
+SALE_PRODUCTS_QUERY = """
+UNWIND $rows AS row
+MATCH (s:Sale {sale_id: row.sale_id})
+MATCH (p:Product {product_id: row.product_id})
+MERGE (s)-[r:INCLUDES_PRODUCT]->(p)
+SET r.quantity = row.quantity
+"""
+
+# Créer les nœuds Event (événements alimentés)
+POWERED_EVENTS_QUERY = """
+UNWIND $rows AS row
+MERGE (e:Event {event_id: row.event_id})
+SET e.name = row.name,
+    e.name_lower = toLower(row.name),
+    e.type = row.type,
+    e.type_lower = toLower(row.type),
+    e.location = row.location,
+    e.date = row.date,
+    e.attendees = row.attendees,
+    e.runtime = row.runtime,
+    e.fuel_saved = row.fuel_saved,
+    e.co2_reduction = row.co2_reduction,
+    e.co2_reduction_tonnes = row.co2_reduction_tonnes
+"""
+
+# Créer les relations avec les produits déployés
+DEPLOYED_AT_QUERY = """
+UNWIND $rows AS row
+MATCH (e:Event {event_id: row.event_id})
+MATCH (p:Product {product_id: row.product_id})
+MERGE (p)-[r:DEPLOYED_AT]->(e)
+SET r.quantity = row.quantity
+"""
+
+# Créer les nœuds RDProject
+RD_PROJECTS_QUERY = """
+UNWIND $rows AS row
+MERGE (r:RDProject {project_id: row.project_id})
+SET r.name = row.name,
+    r.status = row.status,
+    r.objective = row.objective,
+    r.projected_savings = row.projected_savings
+"""
+
+# Lier aux produits cibles
+TARGETS_PRODUCT_QUERY = """
+UNWIND $rows AS row
+MATCH (r:RDProject {project_id: row.project_id})
+MATCH (p:Product {product_id: row.product_id})
+MERGE (r)-[:TARGETS_PRODUCT]->(p)
+"""
+
+
+# Caractères ignorés dans un montant ('€911,750' -> '911750'), retirés en un seul passage
+REVENUE_NOISE_RE = re.compile(r"[€,\s]")
+
+
+@lru_cache(maxsize=4096)
+def _parse_revenue_str(revenue_str):
+    try:
+        return float(REVENUE_NOISE_RE.sub("", revenue_str))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_revenue(revenue_str):
+    """Parse revenue string like '€911,750' to float"""
+    if isinstance(revenue_str, (int, float)):
+        return float(revenue_str)
+    return _parse_revenue_str(revenue_str)
+
+
+def parse_co2_tonnes(co2_str):
+    """Parse '12.5 tonnes CO2' en 12.5; None si la réduction n'est pas exprimée en tonnes"""
+    if not isinstance(co2_str, str) or "tonnes" not in co2_str:
+        return None
+    try:
+        return float(co2_str.split(" ")[0])
+    except ValueError:
+        return None
+
+
+# "PG-M01 x3" -> ("PG-M01", "3"); la quantité est optionnelle ("PG-M01")
+PRODUCT_QUANTITY_RE = re.compile(r"^(.+?)(?: x(\d+))?$")
+
+
+def parse_product_quantity(product_str):
+    """Parse 'PG-M01 x3' en ('PG-M01', 3); quantité None si absente"""
+    product_id, quantity = PRODUCT_QUANTITY_RE.match(product_str).groups()
+    return product_id, int(quantity) if quantity else None
+
+
+# Index sur les clés de MERGE/MATCH: créés avant le chargement, chaque ligne UNWIND les utilise
+KEY_INDEXES = (
+    "CREATE INDEX product_id IF NOT EXISTS FOR (p:Product) ON (p.product_id)",
+    "CREATE INDEX event_id IF NOT EXISTS FOR (e:Event) ON (e.event_id)",
+    "CREATE INDEX trade_show_id IF NOT EXISTS FOR (t:TradeShow) ON (t.event_id)",
+    "CREATE INDEX rd_project_id IF NOT EXISTS FOR (r:RDProject) ON (r.project_id)",
+    "CREATE INDEX sale_id IF NOT EXISTS FOR (s:Sale) ON (s.sale_id)",
+    "CREATE INDEX battery_type IF NOT EXISTS FOR (b:BatteryType) ON (b.type)",
+)
+
+# Index utiles uniquement aux requêtes de lecture: créés après le chargement
+# pour ne pas être maintenus à chaque écriture
+QUERY_INDEXES = (
+    # Ventes filtrées par type de client (agrégation par salon)
+    "CREATE INDEX sale_customer IF NOT EXISTS FOR (s:Sale) ON (s.customer_type)",
+    # Top salons par revenu: tri et LIMIT servis par l'index (ORDER BY ... DESC LIMIT)
+    "CREATE INDEX trade_show_total_sales IF NOT EXISTS FOR (t:TradeShow) ON (t.total_sales)",
+    # Filtres CONTAINS sur les copies en minuscules (*_lower): index TEXT
+    "CREATE TEXT INDEX trade_show_location IF NOT EXISTS FOR (t:TradeShow) ON (t.location_lower)",
+    "CREATE TEXT INDEX battery_type_text IF NOT EXISTS FOR (b:BatteryType) ON (b.type_lower)",
+    "CREATE TEXT INDEX product_category IF NOT EXISTS FOR (p:Product) ON (p.category_lower)",
+    "CREATE TEXT INDEX event_type IF NOT EXISTS FOR (e:Event) ON (e.type_lower)",
+    "CREATE TEXT INDEX event_name IF NOT EXISTS FOR (e:Event) ON (e.name_lower)",
+)
+
+# Migrations idempotentes des graphes chargés avant l'ajout de propriétés dérivées:
+# seuls les nœuds où la propriété manque sont mis à jour
+MIGRATIONS = (
+    "MATCH (t:TradeShow) WHERE t.location_lower IS NULL AND t.location IS NOT NULL "
+    "SET t.location_lower = toLower(t.location)",
+    "MATCH (e:Event) WHERE e.name_lower IS NULL AND e.name IS NOT NULL "
+    "SET e.name_lower = toLower(e.name)",
+    "MATCH (e:Event) WHERE e.type_lower IS NULL AND e.type IS NOT NULL "
+    "SET e.type_lower = toLower(e.type)",
+    "MATCH (p:Product) WHERE p.category_lower IS NULL AND p.category IS NOT NULL "
+    "SET p.category_lower = toLower(p.category)",
+    "MATCH (b:BatteryType) WHERE b.type_lower IS NULL AND b.type IS NOT NULL "
+    "SET b.type_lower = toLower(b.type)",
+    # Même règle que parse_co2_tonnes: toFloat renvoie null si le premier mot n'est pas un nombre
+    "MATCH (e:Event) WHERE e.co2_reduction_tonnes IS NULL AND e.co2_reduction CONTAINS 'tonnes' "
+    "SET e.co2_reduction_tonnes = toFloat(split(e.co2_reduction, ' ')[0])",
+)
+
+
+# Empreinte (blake2b) de chaque fichier chargé, pour ne pas recharger des données inchangées
+# Version du modèle de graphe: à incrémenter quand les propriétés écrites changent,
+# pour forcer le rechargement d'un graphe chargé avec l'ancien modèle
+GRAPH_SCHEMA_VERSION = "3"
+LOAD_META_READ_QUERY = "MATCH (m:LoadMeta) RETURN m.file AS file, m.hash AS hash"
+LOAD_META_WRITE_QUERY = """
+UNWIND $rows AS row
+MERGE (m:LoadMeta {file: row.file})
+SET m.hash = row.hash
+"""
+
+
+def _data_file_hashes():
+    """blake2b des fichiers de données présents: chemin -> hash"""
+    hashes = {}
+    for path in DATA_FILES:
+        if os.path.exists(path):
+            # Lecture par blocs (hashlib.file_digest n'existe qu'à partir de Python 3.11)
+            hasher = hashlib.blake2b()
+            with open(path, 'rb') as f:
+                while chunk := f.read(1 << 20):
+                    hasher.update(chunk)
+            hashes[path] = hasher.hexdigest()
+    return hashes
+
+
+def _write_batches(tx, statements):
+    """Exécute les requêtes UNWIND (requête, lignes) par lots dans une même transaction"""
+    for query, rows in statements:
+        for start in range(0, len(rows), UNWIND_BATCH_SIZE):
+            tx.run(query, rows=rows[start:start + UNWIND_BATCH_SIZE]).consume()
+
+
 class Neo4jLoader:
-    def __init__(self):
-        self.driver = GraphDatabase.driver(
+    def __init__(self, driver=None):
+        # Driver partagé (pool de connexions commun) si fourni, sinon driver dédié
+        self._owns_driver = driver is None
+        self.driver = driver or GraphDatabase.driver(
             os.getenv("NEO4J_URI"),
-            auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+            auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")),
+            **NEO4J_DRIVER_OPTIONS
         )
 
     def close(self):
-        self.driver.close()
+        # Un driver partagé est fermé par son propriétaire
+        if self._owns_driver:
+            self.driver.close()
+
+    def _session(self, session=None):
+        """Réutilise la session fournie (sans la fermer) ou en ouvre une nouvelle"""
+        if session is not None:
+            return nullcontext(session)
+        return self.driver.session(database=NEO4J_DATABASE)
 
-    def clear_database(self):
+    def clear_database(self, session=None):
         """Supprime toutes les données du graphe"""
-        with self.driver.session() as session:
+        with self._session(session) as session:
             session.run("MATCH (n) DETACH DELETE n")
             print("Base de données Neo4j nettoyée")
 
-    def create_indexes(self):
+    def create_indexes(self, session=None, indexes=KEY_INDEXES + QUERY_INDEXES):
         """Crée les index pour optimiser les requêtes"""
-        with self.driver.session() as session:
-            # Index sur les IDs
-            session.run("CREATE INDEX product_id IF NOT EXISTS FOR (p:Product) ON (p.product_id)")
-            session.run("CREATE INDEX event_id IF NOT EXISTS FOR (e:Event) ON (e.event_id)")
-            session.run("CREATE INDEX trade_show_id IF NOT EXISTS FOR (t:TradeShow) ON (t.event_id)")
-            session.run("CREATE INDEX rd_project_id IF NOT EXISTS FOR (r:RDProject) ON (r.project_id)")
-            session.run("CREATE INDEX sale_customer IF NOT EXISTS FOR (s:Sale) ON (s.customer_type)")
+        with self._session(session) as session:
+            for statement in indexes:
+                session.run(statement)
+            # Les index sont peuplés en arrière-plan: attendre qu'ils soient en ligne
+            session.run("CALL db.awaitIndexes(300)")
             print("Index créés avec succès")
 
-    def load_products(self, products_file="data/greenpower_products_enriched.json"):
+    def migrate(self, session=None):
+        """Complète les propriétés dérivées manquantes d'un graphe existant (idempotent)"""
+        with self._session(session) as session:
+            for statement in MIGRATIONS:
+                session.run(statement).consume()
+            print("Migrations du graphe appliquées")
+
+    def load_products(self, products_file=PRODUCTS_FILE, session=None):
         """Charge les produits dans Neo4j"""
         if not os.path.exists(products_file):
             print(f"⚠️  Fichier {products_file} non trouvé - ignoré")
             return
 
-        with open(products_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        with self.driver.session() as session:
-            for product in data.get("products", []):
-                # Créer le nœud Product
-                session.run("""
-                    MERGE (p:Product {product_id: $product_id})
-                    SET p.name = $name,
-                        p.category = $category,
-                        p.continuous_power = $continuous_power,
-                        p.peak_power = $peak_power,
-                        p.battery_capacity = $battery_capacity,
-                        p.battery_type = $battery_type,
-                        p.solar_capacity = $solar_capacity,
-                        p.total_cost = $total_cost,
-                        p.avg_selling_price = $avg_selling_price,
-                        p.margin_percentage = $margin_percentage,
-                        p.co2_reduction = $co2_reduction,
-                        p.rental_available = $rental_available
-                """,
-                    product_id=product["product_id"],
-                    name=product["name"],
-                    category=product["category"],
-                    continuous_power=product["power_output"]["continuous"],
-                    peak_power=product["power_output"]["peak"],
-                    battery_capacity=product["specifications"]["battery_capacity"],
-                    battery_type=product["specifications"]["battery_type"],
-                    solar_capacity=product["specifications"]["solar_panel_capacity"],
-                    total_cost=product["private_cost_breakdown"]["private_total_cost"],
-                    avg_selling_price=product["pricing"]["average_selling_price"],
-                    margin_percentage=product["pricing"]["margin_percentage"],
-                    co2_reduction=product["co2_reduction"],
-                    rental_available=product["rental_available"]
-                )
-
-                # Créer le nœud BatteryType et la relation
-                session.run("""
-                    MERGE (b:BatteryType {type: $battery_type})
-                    WITH b
-                    MATCH (p:Product {product_id: $product_id})
-                    MERGE (p)-[:USES_BATTERY]->(b)
-                """,
-                    battery_type=product["specifications"]["battery_type"],
-                    product_id=product["product_id"]
-                )
-
-        print(f"Chargé {len(data.get('products', []))} produits")
-
-    def parse_revenue(self, revenue_str):
-        """Parse revenue string like '€911,750' to float"""
-        if isinstance(revenue_str, (int, float)):
-            return float(revenue_str)
-        # Remove €, spaces, and convert
-        cleaned = revenue_str.replace('€', '').replace(',', '').replace(' ', '').strip()
-        try:
-            return float(cleaned)
-        except:
-            return 0.0
-
-    def load_events(self, events_file="data/greenpower_events_enriched.json"):
+        # Lecture binaire et parsing en C (orjson)
+        with open(products_file, 'rb') as f:
+            data = orjson.loads(f.read())
+
+        # Une ligne par produit: tout le fichier part en une requête UNWIND
+        products = [
+            {
+                "product_id": product["product_id"],
+                "name": product["name"],
+                "category": product["category"],
+                "continuous_power": product["power_output"]["continuous"],
+                "peak_power": product["power_output"]["peak"],
+                "battery_capacity": product["specifications"]["battery_capacity"],
+                "battery_type": product["specifications"]["battery_type"],
+                "solar_capacity": product["specifications"]["solar_panel_capacity"],
+                "total_cost": product["private_cost_breakdown"]["private_total_cost"],
+                "avg_selling_price": product["pricing"]["average_selling_price"],
+                "margin_percentage": product["pricing"]["margin_percentage"],
+                "co2_reduction": product["co2_reduction"],
+                "rental_available": product["rental_available"]
+            }
+            for product in data.get("products", [])
+        ]
+
+        # Un fichier = une transaction d'écriture
+        with self._session(session) as session:
+            session.execute_write(_write_batches, [
+                (PRODUCTS_QUERY, products),
+                (BATTERY_TYPES_QUERY, products)
+            ])
+
+        print(f"Chargé {len(products)} produits")
+
+    def load_events(self, events_file=EVENTS_FILE, session=None):
         """Charge les événements (trade shows, powered events) dans Neo4j"""
         if not os.path.exists(events_file):
             print(f"⚠️  Fichier {events_file} non trouvé - ignoré")
             return
 
-        with open(events_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        with self.driver.session() as session:
-            # Charger les salons (trade shows)
-            for event in data.get("trade_shows_exhibitions", []):
-                # Créer le nœud TradeShow
-                session.run("""
-                    MERGE (t:TradeShow {event_id: $event_id})
-                    SET t.name = $name,
-                        t.type = $type,
-                        t.location = $location,
-                        t.date = $date,
-                        t.leads_generated = $leads_generated,
-                        t.total_sales = $total_sales
-                """,
-                    event_id=event["event_id"],
-                    name=event["event_name"],
-                    type=event["type"],
-                    location=event["location"],
-                    date=event["date"],
-                    leads_generated=event["sales_data"]["leads_generated"],
-                    total_sales=self.parse_revenue(event["sales_data"]["total_sales"])
-                )
-
-                # Créer les produits affichés et les relations
-                for product_id in event["greenpower_participation"].get("models_displayed", []):
-                    session.run("""
-                        MATCH (t:TradeShow {event_id: $event_id})
-                        MATCH (p:Product {product_id: $product_id})
-                        MERGE (p)-[:DISPLAYED_AT]->(t)
-                    """,
-                        event_id=event["event_id"],
-                        product_id=product_id
-                    )
-
-                # Créer les ventes par type de client
-                for customer_type in ["particuliers", "entreprises", "collectivites"]:
-                    sales = event["sales_data"]["sales_closed"].get(customer_type, {})
-                    if sales.get("units", 0) > 0:
-                        # Créer nœud Sale
-                        sale_id = f"{event['event_id']}_{customer_type}"
-                        session.run("""
-                            MERGE (s:Sale {sale_id: $sale_id})
-                            SET s.customer_type = $customer_type,
-                                s.units = $units,
-                                s.total_revenue = $total_revenue
-                            WITH s
-                            MATCH (t:TradeShow {event_id: $event_id})
-                            MERGE (s)-[:SOLD_AT]->(t)
-                        """,
-                            sale_id=sale_id,
-                            customer_type=customer_type,
-                            units=sales["units"],
-                            total_revenue=self.parse_revenue(sales["total_revenue"]),
-                            event_id=event["event_id"]
-                        )
-
-                        # Lier les produits vendus
-                        for product_str in sales.get("products", []):
-                            # Parser "PG-M01 x3" -> ("PG-M01", 3)
-                            parts = product_str.split(" x")
-                            if len(parts) == 2:
-                                product_id = parts[0]
-                                quantity = int(parts[1])
-                                session.run("""
-                                    MATCH (s:Sale {sale_id: $sale_id})
-                                    MATCH (p:Product {product_id: $product_id})
-                                    MERGE (s)-[r:INCLUDES_PRODUCT]->(p)
-                                    SET r.quantity = $quantity
-                                """,
-                                    sale_id=sale_id,
-                                    product_id=product_id,
-                                    quantity=quantity
-                                )
-
-            print(f"Chargé {len(data.get('trade_shows_exhibitions', []))} salons")
-
-            # Charger les événements alimentés (powered events)
-            for event in data.get("powered_events", []):
-                # Créer le nœud Event
-                session.run("""
-                    MERGE (e:Event {event_id: $event_id})
-                    SET e.name = $name,
-                        e.type = $type,
-                        e.location = $location,
-                        e.date = $date,
-                        e.attendees = $attendees,
-                        e.runtime = $runtime,
-                        e.fuel_saved = $fuel_saved,
-                        e.co2_reduction = $co2_reduction
-                """,
-                    event_id=event["event_id"],
-                    name=event["event_name"],
-                    type=event["type"],
-                    location=event["location"],
-                    date=event["date"],
-                    attendees=event["power_deployment"].get("attendees", "N/A"),
-                    runtime=event["power_deployment"]["runtime"],
-                    fuel_saved=event["power_deployment"]["fuel_saved"],
-                    co2_reduction=event["power_deployment"]["co2_reduction"]
-                )
-
-                # Créer les relations avec les produits déployés
-                for model_str in event["power_deployment"]["models_used"]:
-                    # Parser "PG-U01 x2" -> ("PG-U01", 2)
-                    parts = model_str.split(" x")
-                    if len(parts) == 2:
-                        product_id = parts[0]
-                        quantity = int(parts[1])
-                        session.run("""
-                            MATCH (e:Event {event_id: $event_id})
-                            MATCH (p:Product {product_id: $product_id})
-                            MERGE (p)-[r:DEPLOYED_AT]->(e)
-                            SET r.quantity = $quantity
-                        """,
-                            event_id=event["event_id"],
-                            product_id=product_id,
-                            quantity=quantity
-                        )
-                    else:
-                        # Format sans quantité
-                        product_id = model_str
-                        session.run("""
-                            MATCH (e:Event {event_id: $event_id})
-                            MATCH (p:Product {product_id: $product_id})
-                            MERGE (p)-[r:DEPLOYED_AT]->(e)
-                            SET r.quantity = 1
-                        """,
-                            event_id=event["event_id"],
-                            product_id=product_id
-                        )
-
-            print(f"Chargé {len(data.get('powered_events', []))} événements alimentés")
-
-    def load_rd_projects(self, rd_file="data/greenpower_rd_innovations.json"):
+        # Lecture binaire et parsing en C (orjson)
+        with open(events_file, 'rb') as f:
+            data = orjson.loads(f.read())
+
+        # Lignes de chaque requête UNWIND, construites en un seul passage sur le fichier
+        trade_shows, displayed, sales_rows, sale_products = [], [], [], []
+        for event in data.get("trade_shows_exhibitions", []):
+            trade_shows.append({
+                "event_id": event["event_id"],
+                "name": event["event_name"],
+                "type": event["type"],
+                "location": event["location"],
+                "date": event["date"],
+                "leads_generated": event["sales_data"]["leads_generated"],
+                "total_sales": parse_revenue(event["sales_data"]["total_sales"])
+            })
+
+            # Produits affichés
+            for product_id in event["greenpower_participation"].get("models_displayed", []):
+                displayed.append({"event_id": event["event_id"], "product_id": product_id})
+
+            # Ventes par type de client
+            for customer_type in ["particuliers", "entreprises", "collectivites"]:
+                sales = event["sales_data"]["sales_closed"].get(customer_type, {})
+                if sales.get("units", 0) > 0:
+                    sale_id = f"{event['event_id']}_{customer_type}"
+                    sales_rows.append({
+                        "sale_id": sale_id,
+                        "customer_type": customer_type,
+                        "units": sales["units"],
+                        "total_revenue": parse_revenue(sales["total_revenue"]),
+                        "event_id": event["event_id"]
+                    })
+
+                    # Produits vendus
+                    for product_str in sales.get("products", []):
+                        # Seuls les produits avec quantité sont liés à la vente
+                        product_id, quantity = parse_product_quantity(product_str)
+                        if quantity is not None:
+                            sale_products.append({
+                                "sale_id": sale_id,
+                                "product_id": product_id,
+                                "quantity": quantity
+                            })
+
+        powered_events, deployed = [], []
+        for event in data.get("powered_events", []):
+            powered_events.append({
+                "event_id": event["event_id"],
+                "name": event["event_name"],
+                "type": event["type"],
+                "location": event["location"],
+                "date": event["date"],
+                "attendees": event["power_deployment"].get("attendees", "N/A"),
+                "runtime": event["power_deployment"]["runtime"],
+                "fuel_saved": event["power_deployment"]["fuel_saved"],
+                "co2_reduction": event["power_deployment"]["co2_reduction"],
+                "co2_reduction_tonnes": parse_co2_tonnes(event["power_deployment"]["co2_reduction"])
+            })
+
+            # Produits déployés
+            for model_str in event["power_deployment"]["models_used"]:
+                # Format sans quantité -> 1
+                product_id, quantity = parse_product_quantity(model_str)
+                deployed.append({
+                    "event_id": event["event_id"],
+                    "product_id": product_id,
+                    "quantity": 1 if quantity is None else quantity
+                })
+
+        # Un fichier = une transaction d'écriture
+        with self._session(session) as session:
+            session.execute_write(_write_batches, [
+                (TRADE_SHOWS_QUERY, trade_shows),
+                (DISPLAYED_AT_QUERY, displayed),
+                (SALES_QUERY, sales_rows),
+                (SALE_PRODUCTS_QUERY, sale_products),
+                (POWERED_EVENTS_QUERY, powered_events),
+                (DEPLOYED_AT_QUERY, deployed)
+            ])
+
+        print(f"Chargé {len(trade_shows)} salons")
+        print(f"Chargé {len(powered_events)} événements alimentés")
+
+    def load_rd_projects(self, rd_file=RD_FILE, session=None):
         """Charge les projets R&D dans Neo4j"""
         if not os.path.exists(rd_file):
             print(f"⚠️  Fichier {rd_file} non trouvé - ignoré")
             return
 
-        with open(rd_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        with self.driver.session() as session:
-            for project in data.get("active_rd_projects", []):
-                # Créer le nœud RDProject
-                session.run("""
-                    MERGE (r:RDProject {project_id: $project_id})
-                    SET r.name = $name,
-                        r.status = $status,
-                        r.objective = $objective,
-                        r.projected_savings = $projected_savings
-                """,
-                    project_id=project["project_id"],
-                    name=project["project_name"],
-                    status=project["status"],
-                    objective=project["objective"],
-                    projected_savings=project.get("projected_annual_savings", "N/A")
-                )
-
-                # Lier aux produits cibles
-                for product_id in project.get("target_products", []):
-                    session.run("""
-                        MATCH (r:RDProject {project_id: $project_id})
-                        MATCH (p:Product {product_id: $product_id})
-                        MERGE (r)-[:TARGETS_PRODUCT]->(p)
-                    """,
-                        project_id=project["project_id"],
-                        product_id=product_id
-                    )
-
-        print(f"Chargé {len(data.get('active_rd_projects', []))} projets R&D")
-
-    def load_all(self):
-        """Charge toutes les données"""
+        # Lecture binaire et parsing en C (orjson)
+        with open(rd_file, 'rb') as f:
+            data = orjson.loads(f.read())
+
+        projects = [
+            {
+                "project_id": project["project_id"],
+                "name": project["project_name"],
+                "status": project["status"],
+                "objective": project["objective"],
+                "projected_savings": project.get("projected_annual_savings", "N/A")
+            }
+            for project in data.get("active_rd_projects", [])
+        ]
+        targets = [
+            {"project_id": project["project_id"], "product_id": product_id}
+            for project in data.get("active_rd_projects", [])
+            for product_id in project.get("target_products", [])
+        ]
+
+        # Un fichier = une transaction d'écriture
+        with self._session(session) as session:
+            session.execute_write(_write_batches, [
+                (RD_PROJECTS_QUERY, projects),
+                (TARGETS_PRODUCT_QUERY, targets)
+            ])
+
+        print(f"Chargé {len(projects)} projets R&D")
+
+    def load_all(self, force=False):
+        """
+        Charge toutes les données.
+        Si les fichiers sont identiques (blake2b) à ceux du dernier chargement, le graphe
+        existant est conservé, sauf avec force=True.
+
+        Returns:
+            True si les données ont été (re)chargées, False si le chargement a été évité
+        """
         print("Début du chargement des données dans Neo4j...")
-        self.clear_database()
-        self.create_indexes()
-
-        # Charger les données si les fichiers existent
-        files_loaded = 0
-
-        print("\nChargement des fichiers de données...")
-        self.load_products()
-        if os.path.exists("data/greenpower_products_enriched.json"):
-            files_loaded += 1
-
-        self.load_events()
-        if os.path.exists("data/greenpower_events_enriched.json"):
-            files_loaded += 1
-
-        self.load_rd_projects()
-        if os.path.exists("data/greenpower_rd_innovations.json"):
-            files_loaded += 1
-
+        hashes = _data_file_hashes()
+        load_meta = {**hashes, "schema": GRAPH_SCHEMA_VERSION}
+
+        # Une seule session (une seule connexion empruntée au pool) pour les phases séquentielles
+        with self._session() as session:
+            if not force and hashes:
+                stored = {record["file"]: record["hash"] for record in session.run(LOAD_META_READ_QUERY)}
+                if stored == load_meta:
+                    print("✅ Fichiers de données inchangés depuis le dernier chargement - graphe conservé")
+                    return False
+
+            self.clear_database(session)
+            self.create_indexes(session, KEY_INDEXES)
+
+            print("\nChargement des fichiers de données...")
+            self.load_products(session=session)
+
+            # Événements et projets R&D ne dépendent que des produits: chargés en parallèle,
+            # chacun dans sa propre session (une session n'est pas partageable entre threads;
+            # execute_write rejoue la transaction en cas de conflit de verrous)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(self.load_events), executor.submit(self.load_rd_projects)]
+                for future in futures:
+                    future.result()
+
+            self.create_indexes(session, QUERY_INDEXES)
+
+            # Empreintes enregistrées une fois le chargement complet
+            session.run(LOAD_META_WRITE_QUERY, rows=[
+                {"file": path, "hash": digest} for path, digest in load_meta.items()
+            ])
+
+        files_loaded = len(hashes)
         if files_loaded == 0:
             print("\n⚠️  Aucun fichier de données JSON trouvé dans data/")
             print("   Le graphe Neo4j est vide mais prêt à recevoir des données")
@@ -307,12 +512,13 @@ class Neo4jLoader:
         else:
             print(f"\n✅ {files_loaded} fichier(s) chargé(s) avec succès!")
             print("   Chargement terminé!")
+        return True
 
-    def verify_data(self):
+    def verify_data(self, session=None):
         """Vérifie les données chargées"""
-        with self.driver.session() as session:
-            # Compter les nœuds
-            result = session.run("MATCH (n) RETURN labels(n) as label, count(n) as count")
+        with self._session(session) as session:
+            # Compter les nœuds (hors métadonnées de chargement LoadMeta)
+            result = session.run("MATCH (n) WHERE NOT n:LoadMeta RETURN labels(n) as label, count(n) as count")
             print("\nStatistiques du graphe:")
             for record in result:
                 print(f"  {record['label'][0]}: {record['count']} nœuds")
@@ -1,295 +1,424 @@
+import asyncio
 import os
+import time
+from functools import lru_cache
+from types import MappingProxyType
+import ahocorasick
 from dotenv import load_dotenv
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, Result, RoutingControl
 
 load_dotenv()
 
+# Base explicite: évite la résolution de la base par défaut à chaque requête
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or "neo4j"
+
+# Réglages du pool de connexions, communs à tous les drivers de l'application:
+# taille, attente maximale (s) d'une connexion libre, recyclage des connexions (s)
+NEO4J_DRIVER_OPTIONS = MappingProxyType({
+    "max_connection_pool_size": int(os.getenv("NEO4J_POOL_SIZE", "50")),
+    "connection_acquisition_timeout": float(os.getenv("NEO4J_POOL_TIMEOUT", "5")),
+    "max_connection_lifetime": 3600,
+    "keep_alive": True,
+})
+
+# Requêtes Cypher par nom: chaîne identique à chaque appel (cache de plans côté serveur)
+# et clé stable pour le cache des résultats.
+# Les filtres CONTAINS portent sur les copies en minuscules (*_lower) écrites au chargement,
+# couvertes par des index TEXT; les paramètres sont mis en minuscules côté Python.
+QUERIES = MappingProxyType({
+    # Départ du nœud le plus sélectif (salons filtrés par l'index TEXT), puis expansion
+    "events_with_products_at_location": """
+MATCH (t:TradeShow)
+WHERE t.location_lower CONTAINS $location
+MATCH (t)<-[:SOLD_AT]-(s:Sale)-[:INCLUDES_PRODUCT]->(p:Product)-[:DEPLOYED_AT]->(e:Event)
+RETURN DISTINCT
+    e.name as event_name,
+    e.type as event_type,
+    e.location as event_location,
+    collect(DISTINCT p.name) as products_used,
+    collect(DISTINCT t.name) as tradeshows
+ORDER BY e.name
+""",
+    "events_with_products": """
+MATCH (p:Product)-[:DEPLOYED_AT]->(e:Event)
+MATCH (p)<-[inc:INCLUDES_PRODUCT]-(s:Sale)-[:SOLD_AT]->(t:TradeShow)
+RETURN DISTINCT
+    e.name as event_name,
+    e.type as event_type,
+    e.location as event_location,
+    collect(DISTINCT p.name) as products_used,
+    collect(DISTINCT t.name) as tradeshows
+ORDER BY e.name
+""",
+    # Plusieurs produits en un seul aller-retour (une ligne par produit);
+    # co2_reduction_tonnes est numérique, calculé au chargement
+    "total_co2_saved_by_products": """
+UNWIND $product_ids AS product_id
+MATCH (p:Product {product_id: product_id})-[d:DEPLOYED_AT]->(e:Event)
+RETURN p.name as product_name,
+       p.product_id as product_id,
+       sum(COALESCE(e.co2_reduction_tonnes, 0) * COALESCE(d.quantity, 1)) as total_co2_saved_tonnes,
+       count(e) as num_deployments,
+       collect(e.name) as events
+ORDER BY p.product_id
+""",
+    "tradeshows_sales_by_customer_type": """
+MATCH (s:Sale {customer_type: $customer_type})-[:SOLD_AT]->(t:TradeShow)
+MATCH (s)-[inc:INCLUDES_PRODUCT]->(p:Product)
+RETURN t.name as tradeshow_name,
+       t.location as location,
+       t.date as date,
+       sum(s.total_revenue) as total_revenue,
+       sum(s.units) as total_units,
+       collect(DISTINCT p.name) as products_sold
+ORDER BY total_revenue DESC
+""",
+    # Festivals filtrés d'abord (index TEXT), avant de remonter aux projets R&D
+    "rd_projects_for_festival_products": """
+MATCH (e:Event)
+WHERE e.type_lower CONTAINS 'festival' OR e.name_lower CONTAINS 'festival'
+MATCH (e)-[:DEPLOYED_AT]-(p:Product)<-[:TARGETS_PRODUCT]-(r:RDProject)
+WITH r, p, collect(DISTINCT e.name) as festivals
+RETURN DISTINCT r.name as rd_project_name,
+       r.objective as objective,
+       r.status as status,
+       r.projected_savings as projected_savings,
+       collect(DISTINCT p.name) as target_products,
+       festivals
+ORDER BY r.name
+""",
+    "products_by_battery_type": """
+MATCH (p:Product)-[:USES_BATTERY]->(b:BatteryType)
+WHERE b.type_lower CONTAINS $battery_type
+RETURN p.product_id as product_id,
+       p.name as product_name,
+       p.battery_capacity as battery_capacity,
+       b.type as battery_type,
+       p.total_cost as total_cost,
+       p.avg_selling_price as price
+ORDER BY p.avg_selling_price
+""",
+    "top_revenue_tradeshows": """
+MATCH (t:TradeShow)
+WHERE t.total_sales IS NOT NULL
+RETURN t.name as name,
+       t.location as location,
+       t.date as date,
+       t.total_sales as total_sales,
+       t.leads_generated as leads_generated
+ORDER BY t.total_sales DESC
+LIMIT $limit
+""",
+    "product_sales_across_tradeshows": """
+MATCH (p:Product {product_id: $product_id})<-[inc:INCLUDES_PRODUCT]-(s:Sale)-[:SOLD_AT]->(t:TradeShow)
+RETURN t.name as tradeshow_name,
+       t.location as location,
+       t.date as date,
+       s.customer_type as customer_type,
+       inc.quantity as quantity,
+       s.total_revenue as sale_revenue
+ORDER BY t.date DESC
+""",
+    "events_powered_by_product_type": """
+MATCH (p:Product)-[d:DEPLOYED_AT]->(e:Event)
+WHERE p.category_lower CONTAINS $category
+RETURN e.name as event_name,
+       e.type as event_type,
+       e.location as location,
+       e.attendees as attendees,
+       e.co2_reduction as co2_saved,
+       collect(p.name) as products_used,
+       sum(d.quantity) as total_units
+ORDER BY e.name
+""",
+})
+
+
+# Contexte graphe conservé GRAPH_CONTEXT_CACHE_TTL secondes par question normalisée
+GRAPH_CONTEXT_CACHE_TTL = 300
+GRAPH_CONTEXT_CACHE_SIZE = 512
+# Requêtes exécutées au plus par question: les branches les plus spécifiques d'abord
+GRAPH_CONTEXT_MAX_BRANCHES = 2
+
+# Produits et types de batterie reconnus dans les questions (ordre = priorité)
+PRODUCT_IDS = ("PG-U01", "PG-M01", "PG-P01", "PG-C01", "PG-M02")
+BATTERY_TYPES = ("LiFePO4", "Tesla")
+
+# Mots-clés (en minuscules) par catégorie pour le choix des requêtes du contexte graphe;
+# les produits et types de batterie sont leur propre catégorie
+GRAPH_KEYWORDS = MappingProxyType({
+    "events": ("événements", "events", "déploiements"),
+    "events_tradeshow": ("vendus", "sold", "salon", "tradeshow", "pollutec", "paris"),
+    "paris": ("pollutec", "paris"),
+    "co2": ("co2", "carbone", "émissions", "économisé"),
+    "collectivites": ("collectivités", "collectivites", "municipalités"),
+    "rd": ("r&d", "recherche", "développement", "projets"),
+    "rd_festival": ("festival", "événements", "coûts", "réduire"),
+    "battery": ("batterie", "battery", "lifepo4", "tesla"),
+    "top": ("top", "meilleurs", "plus", "salons", "revenus"),
+    **{name: (name.lower(),) for name in PRODUCT_IDS + BATTERY_TYPES},
+})
+
+
+def _build_graph_keyword_automaton(keywords_by_category):
+    """Automate Aho-Corasick: chaque mot-clé porte toutes les catégories qui le contiennent"""
+    categories_by_keyword = {}
+    for category, keywords in keywords_by_category.items():
+        for keyword in keywords:
+            categories_by_keyword.setdefault(keyword, []).append(category)
+    automaton = ahocorasick.Automaton()
+    for keyword, categories in categories_by_keyword.items():
+        automaton.add_word(keyword, tuple(categories))
+    automaton.make_automaton()
+    return automaton
+
+
+GRAPH_KEYWORD_AUTOMATON = _build_graph_keyword_automaton(GRAPH_KEYWORDS)
+
+
+def _fetch(driver, query_key, params):
+    """Exécute une requête nommée; lignes figées (lecture seule) pour pouvoir être partagées"""
+    # Transaction de lecture gérée par le driver (connexion du pool, routage vers un lecteur)
+    # Result.data: lignes converties en dicts par le driver, sans passer par les Record
+    rows = driver.execute_query(
+        QUERIES[query_key],
+        dict(params),
+        database_=NEO4J_DATABASE,
+        routing_=RoutingControl.READ,
+        result_transformer_=Result.data
+    )
+    return tuple(MappingProxyType(row) for row in rows)
+
+
+@lru_cache(maxsize=256)
+def _fetch_cached(driver, query_key, params):
+    """Résultats mis en cache par (driver, requête, paramètres)"""
+    return _fetch(driver, query_key, params)
+
+
 class Neo4jQuerier:
-    def __init__(self):
-        self.driver = GraphDatabase.driver(
+    def __init__(self, driver=None, cache=True):
+        # Driver partagé (pool de connexions commun) si fourni, sinon driver dédié
+        self._owns_driver = driver is None
+        self.driver = driver or GraphDatabase.driver(
             os.getenv("NEO4J_URI"),
-            auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+            auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")),
+            **NEO4J_DRIVER_OPTIONS
         )
+        # Sans cache: chaque appel interroge Neo4j (mesures de performance)
+        self.cache = cache
+        # Cache par question: (question normalisée, max_branches) -> (horodatage, contexte)
+        self._context_cache = {}
+        self._hits = 0
+        self._misses = 0
 
     def close(self):
-        self.driver.close()
+        # Un driver partagé est fermé par son propriétaire
+        if self._owns_driver:
+            self.driver.close()
+
+    def clear_cache(self):
+        """Vide les caches des questions et des résultats (après un rechargement du graphe)"""
+        self._context_cache.clear()
+        _fetch_cached.cache_clear()
+
+    def cache_stats(self):
+        """Succès/échecs des deux niveaux de cache: par question et par requête"""
+        query_info = _fetch_cached.cache_info()
+        return {
+            "context_hits": self._hits,
+            "context_misses": self._misses,
+            "context_size": len(self._context_cache),
+            "query_hits": query_info.hits,
+            "query_misses": query_info.misses,
+            "query_size": query_info.currsize,
+        }
+
+    def _run(self, query_key, **params):
+        """Exécute une requête nommée; chaque appelant reçoit ses propres copies des lignes"""
+        fetch = _fetch_cached if self.cache else _fetch
+        rows = fetch(self.driver, query_key, tuple(sorted(params.items())))
+        return [dict(row) for row in rows]
 
     def query_events_with_products_sold_at_tradeshows(self, location=None):
         """
         Question multi-hop: Quels événements ont utilisé des produits vendus à un salon?
         DEPLOYED_AT <- Product -> INCLUDES_PRODUCT <- Sale -> SOLD_AT -> TradeShow
         """
-        with self.driver.session() as session:
-            if location:
-                query = """
-                MATCH (p:Product)-[:DEPLOYED_AT]->(e:Event)
-                MATCH (p)<-[inc:INCLUDES_PRODUCT]-(s:Sale)-[:SOLD_AT]->(t:TradeShow)
-                WHERE toLower(t.location) CONTAINS toLower($location)
-                RETURN DISTINCT
-                    e.name as event_name,
-                    e.type as event_type,
-                    e.location as event_location,
-                    collect(DISTINCT p.name) as products_used,
-                    collect(DISTINCT t.name) as tradeshows
-                ORDER BY e.name
-                """
-                result = session.run(query, location=location)
-            else:
-                query = """
-                MATCH (p:Product)-[:DEPLOYED_AT]->(e:Event)
-                MATCH (p)<-[inc:INCLUDES_PRODUCT]-(s:Sale)-[:SOLD_AT]->(t:TradeShow)
-                RETURN DISTINCT
-                    e.name as event_name,
-                    e.type as event_type,
-                    e.location as event_location,
-                    collect(DISTINCT p.name) as products_used,
-                    collect(DISTINCT t.name) as tradeshows
-                ORDER BY e.name
-                """
-                result = session.run(query)
-
-            return [dict(record) for record in result]
+        if location:
+            return self._run("events_with_products_at_location", location=location.lower())
+        return self._run("events_with_products")
 
     def query_total_co2_saved_by_product(self, product_id):
         """
         Question multi-hop: Quel est le CO2 total économisé par tous les déploiements d'un produit?
         Product -> DEPLOYED_AT -> Event (avec co2_reduction)
         """
-        with self.driver.session() as session:
-            query = """
-            MATCH (p:Product {product_id: $product_id})-[d:DEPLOYED_AT]->(e:Event)
-            WITH p, e, d,
-                 CASE
-                   WHEN e.co2_reduction CONTAINS 'tonnes' THEN
-                     toFloat(split(e.co2_reduction, ' ')[0]) * COALESCE(d.quantity, 1)
-                   ELSE 0
-                 END as co2_saved
-            RETURN p.name as product_name,
-                   p.product_id as product_id,
-                   sum(co2_saved) as total_co2_saved_tonnes,
-                   count(e) as num_deployments,
-                   collect(e.name) as events
-            """
-            result = session.run(query, product_id=product_id)
-            return [dict(record) for record in result]
+        return self.query_total_co2_saved_by_products([product_id])
+
+    def query_total_co2_saved_by_products(self, product_ids):
+        """
+        Même question pour plusieurs produits, en une seule requête (UNWIND)
+        """
+        return self._run("total_co2_saved_by_products", product_ids=tuple(product_ids))
 
     def query_tradeshows_sales_by_customer_type(self, customer_type="collectivites"):
         """
         Question multi-hop: Liste les salons où on a vendu aux collectivités avec le revenu total
         TradeShow <- SOLD_AT <- Sale (customer_type = collectivites)
         """
-        with self.driver.session() as session:
-            query = """
-            MATCH (s:Sale {customer_type: $customer_type})-[:SOLD_AT]->(t:TradeShow)
-            MATCH (s)-[inc:INCLUDES_PRODUCT]->(p:Product)
-            RETURN t.name as tradeshow_name,
-                   t.location as location,
-                   t.date as date,
-                   sum(s.total_revenue) as total_revenue,
-                   sum(s.units) as total_units,
-                   collect(DISTINCT p.name) as products_sold
-            ORDER BY total_revenue DESC
-            """
-            result = session.run(query, customer_type=customer_type)
-            return [dict(record) for record in result]
+        return self._run("tradeshows_sales_by_customer_type", customer_type=customer_type)
 
     def query_rd_projects_for_festival_products(self):
         """
         Question multi-hop: Quels projets R&D visent à réduire les coûts des produits utilisés aux festivals?
         Event (type=festival) <- DEPLOYED_AT <- Product <- TARGETS_PRODUCT <- RDProject
         """
-        with self.driver.session() as session:
-            query = """
-            MATCH (e:Event)-[:DEPLOYED_AT]-(p:Product)<-[:TARGETS_PRODUCT]-(r:RDProject)
-            WHERE toLower(e.type) CONTAINS 'festival' OR toLower(e.name) CONTAINS 'festival'
-            WITH r, p, collect(DISTINCT e.name) as festivals
-            RETURN DISTINCT r.name as rd_project_name,
-                   r.objective as objective,
-                   r.status as status,
-                   r.projected_savings as projected_savings,
-                   collect(DISTINCT p.name) as target_products,
-                   festivals
-            ORDER BY r.name
-            """
-            result = session.run(query)
-            return [dict(record) for record in result]
+        return self._run("rd_projects_for_festival_products")
 
     def query_products_by_battery_type(self, battery_type):
         """
         Recherche simple: Quels produits utilisent un type de batterie spécifique?
         """
-        with self.driver.session() as session:
-            query = """
-            MATCH (p:Product)-[:USES_BATTERY]->(b:BatteryType)
-            WHERE toLower(b.type) CONTAINS toLower($battery_type)
-            RETURN p.product_id as product_id,
-                   p.name as product_name,
-                   p.battery_capacity as battery_capacity,
-                   b.type as battery_type,
-                   p.total_cost as total_cost,
-                   p.avg_selling_price as price
-            ORDER BY p.avg_selling_price
-            """
-            result = session.run(query, battery_type=battery_type)
-            return [dict(record) for record in result]
+        return self._run("products_by_battery_type", battery_type=battery_type.lower())
 
     def query_top_revenue_tradeshows(self, limit=5):
         """
         Recherche simple: Top salons par revenu
         """
-        with self.driver.session() as session:
-            query = """
-            MATCH (t:TradeShow)
-            RETURN t.name as name,
-                   t.location as location,
-                   t.date as date,
-                   t.total_sales as total_sales,
-                   t.leads_generated as leads_generated
-            ORDER BY t.total_sales DESC
-            LIMIT $limit
-            """
-            result = session.run(query, limit=limit)
-            return [dict(record) for record in result]
+        return self._run("top_revenue_tradeshows", limit=limit)
 
     def query_product_sales_across_tradeshows(self, product_id):
         """
         Question multi-hop: Dans quels salons un produit a-t-il été vendu et en quelle quantité?
         """
-        with self.driver.session() as session:
-            query = """
-            MATCH (p:Product {product_id: $product_id})<-[inc:INCLUDES_PRODUCT]-(s:Sale)-[:SOLD_AT]->(t:TradeShow)
-            RETURN t.name as tradeshow_name,
-                   t.location as location,
-                   t.date as date,
-                   s.customer_type as customer_type,
-                   inc.quantity as quantity,
-                   s.total_revenue as sale_revenue
-            ORDER BY t.date DESC
-            """
-            result = session.run(query, product_id=product_id)
-            return [dict(record) for record in result]
+        return self._run("product_sales_across_tradeshows", product_id=product_id)
 
     def query_events_powered_by_product_type(self, category):
         """
         Question: Quels événements ont été alimentés par un type de produit?
         """
-        with self.driver.session() as session:
-            query = """
-            MATCH (p:Product)-[d:DEPLOYED_AT]->(e:Event)
-            WHERE toLower(p.category) CONTAINS toLower($category)
-            RETURN e.name as event_name,
-                   e.type as event_type,
-                   e.location as location,
-                   e.attendees as attendees,
-                   e.co2_reduction as co2_saved,
-                   collect(p.name) as products_used,
-                   sum(d.quantity) as total_units
-            ORDER BY e.name
-            """
-            result = session.run(query, category=category)
-            return [dict(record) for record in result]
-
-    def get_graph_context_for_question(self, question):
+        return self._run("events_powered_by_product_type", category=category.lower())
+
+    def _plan_graph_queries(self, question_lower):
         """
-        Retourne un contexte du graphe pertinent pour une question donnée.
-        Cette fonction analyse la question et exécute les requêtes appropriées.
+        Analyse la question et retourne les requêtes candidates,
+        sous forme de (query_type, méthode, arguments), de la plus spécifique
+        à la plus générale (ordre du contexte).
         """
-        question_lower = question.lower()
-        context = []
+        # Un seul parcours de la question pour toutes les catégories de mots-clés
+        hits = {tag for _, tags in GRAPH_KEYWORD_AUTOMATON.iter(question_lower) for tag in tags}
+
+        def branches():
+            # Détection de patterns de questions, par spécificité décroissante
+            if "rd" in hits and "rd_festival" in hits:
+                yield ("rd_projects_for_festivals", self.query_rd_projects_for_festival_products, ())
+
+            if "co2" in hits:
+                # Produits mentionnés, directement reconnus par l'automate: une seule requête
+                product_ids = [prod_id for prod_id in PRODUCT_IDS if prod_id in hits]
+                if product_ids:
+                    yield (f"total_co2_saved_by_{'_'.join(product_ids)}",
+                           self.query_total_co2_saved_by_products, (product_ids,))
 
-        # Détection de patterns de questions
-        if any(word in question_lower for word in ["événements", "events", "déploiements"]):
-            if any(word in question_lower for word in ["vendus", "sold", "salon", "tradeshow", "pollutec", "paris"]):
+            if "collectivites" in hits:
+                yield ("tradeshows_collectivites_sales",
+                       self.query_tradeshows_sales_by_customer_type, ("collectivites",))
+
+            if "battery" in hits:
+                battery_type = next((name for name in BATTERY_TYPES if name in hits), "")
+                if battery_type:
+                    yield (f"products_with_{battery_type}_battery",
+                           self.query_products_by_battery_type, (battery_type,))
+
+            if "events" in hits and "events_tradeshow" in hits:
                 # Question sur événements avec produits vendus aux salons
-                location = None
-                if "pollutec" in question_lower or "paris" in question_lower:
-                    location = "Paris"
-                results = self.query_events_with_products_sold_at_tradeshows(location)
-                if results:
-                    context.append({
-                        "query_type": "events_with_products_sold_at_tradeshows",
-                        "results": results
-                    })
-
-        if any(word in question_lower for word in ["co2", "carbone", "émissions", "économisé"]):
-            # Trouver le produit mentionné
-            product_ids = ["PG-U01", "PG-M01", "PG-P01", "PG-C01", "PG-M02"]
-            for prod_id in product_ids:
-                if prod_id.lower() in question_lower:
-                    results = self.query_total_co2_saved_by_product(prod_id)
-                    if results:
-                        context.append({
-                            "query_type": f"total_co2_saved_by_{prod_id}",
-                            "results": results
-                        })
-
-        if any(word in question_lower for word in ["collectivités", "collectivites", "municipalités"]):
-            results = self.query_tradeshows_sales_by_customer_type("collectivites")
-            if results:
-                context.append({
-                    "query_type": "tradeshows_collectivites_sales",
-                    "results": results
-                })
-
-        if any(word in question_lower for word in ["r&d", "recherche", "développement", "projets"]):
-            if any(word in question_lower for word in ["festival", "événements", "coûts", "réduire"]):
-                results = self.query_rd_projects_for_festival_products()
-                if results:
-                    context.append({
-                        "query_type": "rd_projects_for_festivals",
-                        "results": results
-                    })
-
-        if any(word in question_lower for word in ["batterie", "battery", "lifepo4", "tesla"]):
-            battery_type = ""
-            if "lifepo4" in question_lower:
-                battery_type = "LiFePO4"
-            elif "tesla" in question_lower:
-                battery_type = "Tesla"
-            if battery_type:
-                results = self.query_products_by_battery_type(battery_type)
-                if results:
-                    context.append({
-                        "query_type": f"products_with_{battery_type}_battery",
-                        "results": results
-                    })
-
-        if any(word in question_lower for word in ["top", "meilleurs", "plus", "salons", "revenus"]):
-            results = self.query_top_revenue_tradeshows(5)
-            if results:
-                context.append({
-                    "query_type": "top_revenue_tradeshows",
-                    "results": results
-                })
+                location = "Paris" if "paris" in hits else None
+                yield ("events_with_products_sold_at_tradeshows",
+                       self.query_events_with_products_sold_at_tradeshows, (location,))
+
+            if "top" in hits:
+                yield ("top_revenue_tradeshows", self.query_top_revenue_tradeshows, (5,))
+
+        return list(branches())
+
+    @staticmethod
+    async def _gather_graph_queries(planned):
+        """Requêtes indépendantes lancées en parallèle: durée = la plus lente, pas la somme"""
+        return await asyncio.gather(*(
+            asyncio.to_thread(method, *args) for _, method, args in planned
+        ))
 
+    def get_graph_context_for_question(self, question, max_branches=GRAPH_CONTEXT_MAX_BRANCHES):
+        """
+        Retourne un contexte du graphe pertinent pour une question donnée.
+        Cette fonction analyse la question et exécute les requêtes appropriées
+        (au plus max_branches résultats non vides, les plus spécifiques; None: tous).
+        """
+        question_lower = " ".join(question.lower().split())
+        cache_key = (question_lower, max_branches)
+        cached = self._context_cache.get(cache_key) if self.cache else None
+        if cached is not None and time.monotonic() - cached[0] < GRAPH_CONTEXT_CACHE_TTL:
+            self._hits += 1
+            context = cached[1]
+        else:
+            self._misses += 1
+            context = self._build_graph_context(question_lower, max_branches)
+            if self.cache:
+                self._context_cache[cache_key] = (time.monotonic(), context)
+                # Éviction des plus anciennes entrées (ordre d'insertion)
+                for stale_key in list(self._context_cache)[:-GRAPH_CONTEXT_CACHE_SIZE]:
+                    self._context_cache.pop(stale_key, None)
+
+        # Copies: le contexte en cache est partagé entre les appels
+        return [
+            {"query_type": part["query_type"], "results": [dict(row) for row in part["results"]]}
+            for part in context
+        ]
+
+    def _build_graph_context(self, question_lower, max_branches):
+        """
+        Exécute les requêtes choisies pour la question et assemble le contexte.
+        Les branches sont lancées par vagues parallèles, dans l'ordre de priorité:
+        une branche sans résultat laisse sa place à la suivante, jusqu'à
+        max_branches branches non vides (None: toutes les branches).
+        """
+        planned = self._plan_graph_queries(question_lower)
+        context = []
+        while planned and (max_branches is None or len(context) < max_branches):
+            wave_size = len(planned) if max_branches is None else max_branches - len(context)
+            wave, planned = planned[:wave_size], planned[wave_size:]
+            all_results = asyncio.run(self._gather_graph_queries(wave))
+            context.extend(
+                {"query_type": query_type, "results": results}
+                for (query_type, _, _), results in zip(wave, all_results)
+                if results
+            )
         return context
 
     def format_graph_context(self, context):
         """
         Formate le contexte du graphe en texte lisible pour le LLM
         """
-        if not context:
-            return ""
+        return "\n".join(self._format_lines(context or ()))
 
-        formatted_parts = []
+    @staticmethod
+    def _format_lines(context):
+        """Lignes du contexte formaté, produites au fil de l'eau (générateur)"""
         for item in context:
-            query_type = item["query_type"]
             results = item["results"]
-
             if not results:
                 continue
 
-            formatted_parts.append(f"\n=== Résultats de la requête: {query_type} ===\n")
+            yield f"\n=== Résultats de la requête: {item['query_type']} ===\n"
 
             for result in results:
                 for key, value in result.items():
-                    if isinstance(value, list):
-                        formatted_parts.append(f"{key}: {', '.join(str(v) for v in value)}")
+                    if type(value) is list:
+                        yield f"{key}: {', '.join(map(str, value))}"
                     else:
-                        formatted_parts.append(f"{key}: {value}")
-                formatted_parts.append("---")
-
-        return "\n".join(formatted_parts)
+                        yield f"{key}: {value}"
+                yield "---"
 
 if __name__ == "__main__":
     # Test des requêtes
@@ -4,16 +4,51 @@ pour extraire texte, tableaux, images avec descriptions enrichies.
 """
 
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Tuple
+import asyncio
 import base64
+import hashlib
 import io
 import json
+import os
+import re
 
+import orjson
 from PIL import Image
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from mistralai import Mistral
 from langchain_core.documents import Document
 
+# Réponse entourée d'un bloc markdown (```json ... ```): contenu du bloc
+MARKDOWN_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+# Prompt structuré pour extraction intelligente
+PAGE_ANALYSIS_PROMPT = """Analyse cette page de document PDF et extrait les informations suivantes au format JSON structuré:
+
+1. **text_content**: Le texte complet de la page avec sa structure (titres, paragraphes, listes)
+2. **tables**: Liste de tous les tableaux trouvés avec:
+   - description: Description du contenu du tableau
+   - headers: En-têtes de colonnes (liste de strings)
+   - data_summary: Résumé des données importantes
+3. **visual_elements**: Liste de tous les éléments visuels (images, graphiques, diagrammes) avec:
+   - type: "image", "chart", "diagram", "logo", etc.
+   - description: Description détaillée du contenu
+   - position: "top", "middle", "bottom"
+4. **document_structure**:
+   - has_header: bool
+   - has_footer: bool
+   - layout_type: "single_column", "multi_column", "mixed"
+
+Réponds UNIQUEMENT en JSON valide, sans markdown."""
+
+# Plusieurs pages par requête: une analyse (format ci-dessus) par image, dans l'ordre
+BATCH_ANALYSIS_PROMPT = """Tu reçois {count} pages de document PDF, dans l'ordre des images.
+Pour CHAQUE page, applique les consignes suivantes:
+
+{page_prompt}
+
+Réponds UNIQUEMENT par un tableau JSON de {count} objets (un par page, dans l'ordre des images), sans markdown."""
+
 
 class PixtralPDFProcessor:
     """
@@ -26,7 +61,13 @@ class PixtralPDFProcessor:
         mistral_api_key: str,
         model: str = "pixtral-12b-2409",
         cache_images: bool = False,
-        cache_dir: Optional[Path] = None
+        cache_dir: Optional[Path] = None,
+        cache_results: bool = True,
+        results_cache_dir: Optional[Path] = None,
+        max_concurrency: int = 10,
+        image_quality: int = 80,
+        max_image_side: int = 2048,
+        pages_per_request: int = 1
     ):
         """
         Initialise le processeur Pixtral.
@@ -36,40 +77,48 @@ class PixtralPDFProcessor:
             model: Modèle Pixtral ("pixtral-12b-2409" ou "pixtral-large-latest")
             cache_images: Si True, sauvegarde les images extraites
             cache_dir: Répertoire de cache (par défaut: data/.pdf_cache)
+            cache_results: Si True, conserve l'analyse de chaque page (clé: image encodée, prompt, modèle)
+            results_cache_dir: Répertoire du cache d'analyses (par défaut: .pixtral_cache)
+            max_concurrency: Nombre maximal d'appels Pixtral simultanés
+            image_quality: Qualité WebP des pages envoyées à Pixtral (0-100)
+            max_image_side: Plus grand côté (px) des pages envoyées; au-delà, réduction
+            pages_per_request: Pages envoyées ensemble dans une requête Pixtral
+                (par défaut 1: une requête par page; au-delà, analyse groupée optionnelle)
         """
         self.client = Mistral(api_key=mistral_api_key)
         self.model = model
         self.cache_images = cache_images
         self.cache_dir = cache_dir or Path("data/.pdf_cache")
+        self.cache_results = cache_results
+        self.results_cache_dir = results_cache_dir or Path(".pixtral_cache")
+        self.max_concurrency = max_concurrency
+        self.image_quality = image_quality
+        self.max_image_side = max_image_side
+        self.pages_per_request = max(1, pages_per_request)
 
         if self.cache_images:
             self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if self.cache_results:
+            self.results_cache_dir.mkdir(parents=True, exist_ok=True)
 
-    def convert_pdf_to_images(
-        self,
-        pdf_path: str,
-        dpi: int = 200
-    ) -> List[Image.Image]:
+    def convert_pdf_page(self, pdf_path: str, page_num: int, dpi: int = 150) -> Image.Image:
         """
-        Convertit chaque page PDF en image PIL.
+        Convertit une seule page PDF en image PIL, à la demande.
 
         Args:
             pdf_path: Chemin du fichier PDF
-            dpi: Résolution (300 pour qualité haute, 200 pour performance)
+            page_num: Numéro de page (à partir de 0)
+            dpi: Résolution (150 suffit pour des pages de texte)
 
         Returns:
-            Liste d'images PIL (une par page)
+            Image PIL de la page
         """
-        images = convert_from_path(
-            pdf_path,
-            dpi=dpi,
-            fmt='png'
-        )
-        return images
+        return convert_from_path(pdf_path, dpi=dpi, first_page=page_num + 1, last_page=page_num + 1)[0]
 
     def encode_image_to_base64(self, image: Image.Image) -> str:
         """
-        Encode une image PIL en base64 pour l'API Pixtral.
+        Encode une image PIL en base64 (WebP) pour l'API Pixtral.
+        Les pages trop grandes sont réduites (copie): moins d'octets à envoyer.
 
         Args:
             image: Image PIL
@@ -77,9 +126,18 @@ class PixtralPDFProcessor:
         Returns:
             String base64
         """
+        return base64.b64encode(self._encode_image(image)).decode("ascii")
+
+    def _encode_image(self, image: Image.Image) -> memoryview:
+        """
+        Octets WebP de l'image (réduite si besoin), envoyés à Pixtral.
+        Vue sur le tampon (getbuffer): pas de copie des octets avant hash et base64.
+        """
+        image = image.convert("RGB")
+        image.thumbnail((self.max_image_side, self.max_image_side), Image.Resampling.LANCZOS)
         buffered = io.BytesIO()
-        image.save(buffered, format="PNG")
-        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+        image.save(buffered, format="WEBP", quality=self.image_quality, method=4)
+        return buffered.getbuffer()
 
     def analyze_page_with_pixtral(
         self,
@@ -101,110 +159,219 @@ class PixtralPDFProcessor:
         Returns:
             Dict avec structured_text, tables, visual_elements, metadata
         """
-        base64_image = self.encode_image_to_base64(image)
+        messages, content_key = self._build_messages(image, custom_prompt)
+        cached = self._load_content_analysis(content_key, page_num)
+        if cached is not None:
+            return cached
 
-        # Prompt structuré pour extraction intelligente
-        prompt = custom_prompt or """Analyse cette page de document PDF et extrait les informations suivantes au format JSON structuré:
-
-1. **text_content**: Le texte complet de la page avec sa structure (titres, paragraphes, listes)
-2. **tables**: Liste de tous les tableaux trouvés avec:
-   - description: Description du contenu du tableau
-   - headers: En-têtes de colonnes (liste de strings)
-   - data_summary: Résumé des données importantes
-3. **visual_elements**: Liste de tous les éléments visuels (images, graphiques, diagrammes) avec:
-   - type: "image", "chart", "diagram", "logo", etc.
-   - description: Description détaillée du contenu
-   - position: "top", "middle", "bottom"
-4. **document_structure**:
-   - has_header: bool
-   - has_footer: bool
-   - layout_type: "single_column", "multi_column", "mixed"
+        try:
+            response = self.client.chat.complete(
+                model=self.model,
+                messages=messages,
+                temperature=0.0
+            )
+        except Exception as e:
+            print(f"Erreur analyse Pixtral page {page_num}: {e}")
+            return self._failed_analysis(page_num, str(e))
 
-Réponds UNIQUEMENT en JSON valide, sans markdown."""
+        result = self._parse_response(response.choices[0].message.content, page_num)
+        self._save_content_analysis(content_key, result)
+        return result
 
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": f"data:image/png;base64,{base64_image}"
-                    }
-                ]
-            }
-        ]
+    async def analyze_page_with_pixtral_async(
+        self,
+        image: Image.Image,
+        page_num: int,
+        custom_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Version asynchrone de analyze_page_with_pixtral, pour analyser
+        plusieurs pages en parallèle.
+        """
+        messages, content_key = self._build_messages(image, custom_prompt)
+        cached = self._load_content_analysis(content_key, page_num)
+        if cached is not None:
+            return cached
 
         try:
-            response = self.client.chat.complete(
+            response = await self.client.chat.complete_async(
                 model=self.model,
                 messages=messages,
                 temperature=0.0
             )
+        except Exception as e:
+            print(f"Erreur analyse Pixtral page {page_num}: {e}")
+            return self._failed_analysis(page_num, str(e))
 
-            # Parse JSON response
-            content = response.choices[0].message.content
-
-            # Nettoyer le contenu si markdown est présent
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
+        result = self._parse_response(response.choices[0].message.content, page_num)
+        self._save_content_analysis(content_key, result)
+        return result
 
-            # Parser le JSON
-            analysis = json.loads(content)
+    def _build_messages(
+        self,
+        image: Image.Image,
+        custom_prompt: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Message utilisateur (prompt + image encodée) pour l'API Pixtral, et clé
+        de contenu: blake2b de l'image encodée et du prompt.
+        """
+        prompt = custom_prompt or PAGE_ANALYSIS_PROMPT
+        image_bytes = self._encode_image(image)
 
-            # Valider la structure de base
-            if not isinstance(analysis, dict):
-                raise ValueError(f"Réponse Pixtral invalide: devrait être un dict, reçu {type(analysis)}")
-
-            # Assurer que les champs requis existent
-            if "text_content" not in analysis:
-                analysis["text_content"] = ""
-            if "tables" not in analysis or not isinstance(analysis["tables"], list):
-                analysis["tables"] = []
-            if "visual_elements" not in analysis or not isinstance(analysis["visual_elements"], list):
-                analysis["visual_elements"] = []
-            if "document_structure" not in analysis or not isinstance(analysis["document_structure"], dict):
-                analysis["document_structure"] = {}
-
-            return {
-                "page_number": page_num,
-                "analysis": analysis,
-                "success": True,
-                "error": None
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    self._image_part(image_bytes)
+                ]
             }
+        ], self._content_key(image_bytes, prompt)
+
+    @staticmethod
+    def _content_key(image_bytes: memoryview, prompt: str) -> str:
+        """Clé de contenu: blake2b de l'image encodée et du prompt."""
+        content_hash = hashlib.blake2b(image_bytes, digest_size=16)
+        content_hash.update(prompt.encode("utf-8"))
+        return content_hash.hexdigest()
+
+    @staticmethod
+    def _image_part(image_bytes: memoryview) -> Dict[str, str]:
+        """Image encodée au format image_url de l'API Pixtral."""
+        base64_image = base64.b64encode(image_bytes).decode("ascii")
+        return {
+            "type": "image_url",
+            "image_url": f"data:image/webp;base64,{base64_image}"
+        }
+
+    def _failed_analysis(self, page_num: int, error: str) -> Dict[str, Any]:
+        """Résultat vide d'une page dont l'analyse a échoué."""
+        return {
+            "page_number": page_num,
+            "analysis": {
+                "text_content": "",
+                "tables": [],
+                "visual_elements": [],
+                "document_structure": {}
+            },
+            "success": False,
+            "error": error
+        }
+
+    def _parse_response(self, content: str, page_num: int) -> Dict[str, Any]:
+        """Parse et valide la réponse JSON de Pixtral pour une page."""
+        try:
+            # Nettoyer le contenu si markdown est présent (un seul passage)
+            fenced = MARKDOWN_FENCE_RE.match(content)
+            content = fenced.group(1) if fenced else content.strip()
+
+            # Parser le JSON (orjson; ses erreurs dérivent de json.JSONDecodeError)
+            return self._page_result(orjson.loads(content), page_num)
 
         except json.JSONDecodeError as e:
             # Erreur de parsing JSON - logger le contenu reçu
             print(f"Erreur JSON parsing page {page_num}: {e}")
-            print(f"Contenu reçu: {content[:500] if 'content' in locals() else 'N/A'}")
-            return {
-                "page_number": page_num,
-                "analysis": {
-                    "text_content": "",
-                    "tables": [],
-                    "visual_elements": [],
-                    "document_structure": {}
-                },
-                "success": False,
-                "error": f"JSON parsing error: {str(e)}"
-            }
+            print(f"Contenu reçu: {content[:500]}")
+            return self._failed_analysis(page_num, f"JSON parsing error: {str(e)}")
 
         except Exception as e:
             # Autre erreur - fallback
             print(f"Erreur analyse Pixtral page {page_num}: {e}")
-            return {
-                "page_number": page_num,
-                "analysis": {
-                    "text_content": "",
-                    "tables": [],
-                    "visual_elements": [],
-                    "document_structure": {}
-                },
-                "success": False,
-                "error": str(e)
-            }
+            return self._failed_analysis(page_num, str(e))
+
+    @staticmethod
+    def _page_result(analysis: Any, page_num: int) -> Dict[str, Any]:
+        """Valide l'analyse JSON d'une page et complète les champs manquants."""
+        # Valider la structure de base
+        if not isinstance(analysis, dict):
+            raise ValueError(f"Réponse Pixtral invalide: devrait être un dict, reçu {type(analysis)}")
+
+        # Assurer que les champs requis existent
+        if "text_content" not in analysis:
+            analysis["text_content"] = ""
+        if "tables" not in analysis or not isinstance(analysis["tables"], list):
+            analysis["tables"] = []
+        if "visual_elements" not in analysis or not isinstance(analysis["visual_elements"], list):
+            analysis["visual_elements"] = []
+        if "document_structure" not in analysis or not isinstance(analysis["document_structure"], dict):
+            analysis["document_structure"] = {}
+
+        return {
+            "page_number": page_num,
+            "analysis": analysis,
+            "success": True,
+            "error": None
+        }
+
+    def analyze_pages_batch(self, images: List[Image.Image], page_nums: List[int]) -> List[Dict[str, Any]]:
+        """Version synchrone de analyze_pages_batch_async."""
+        return asyncio.run(self.analyze_pages_batch_async(images, page_nums))
+
+    async def analyze_pages_batch_async(
+        self,
+        images: List[Image.Image],
+        page_nums: List[int]
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyse plusieurs pages en une seule requête Pixtral (une image par page).
+        Les pages déjà en cache ne sont pas envoyées; si la réponse groupée est
+        invalide, les pages restantes sont analysées une par une.
+        Les analyses groupées sont mises en cache sous leur propre clé (prompt groupé),
+        distincte de celle des analyses page par page.
+
+        Args:
+            images: Images PIL des pages
+            page_nums: Numéros de page correspondants
+
+        Returns:
+            Un résultat par page, dans l'ordre de page_nums
+        """
+        encoded = [self._encode_image(image) for image in images]
+        page_keys = [self._content_key(image_bytes, PAGE_ANALYSIS_PROMPT) for image_bytes in encoded]
+        batch_keys = [self._content_key(image_bytes, BATCH_ANALYSIS_PROMPT) for image_bytes in encoded]
+        # Analyse page par page de préférence, sinon celle d'une requête groupée antérieure
+        results = [
+            self._load_content_analysis(page_key, page_num)
+            or self._load_content_analysis(batch_key, page_num)
+            for page_key, batch_key, page_num in zip(page_keys, batch_keys, page_nums)
+        ]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if len(missing) > 1:
+            prompt = BATCH_ANALYSIS_PROMPT.format(count=len(missing), page_prompt=PAGE_ANALYSIS_PROMPT)
+            messages = [{
+                "role": "user",
+                "content": [{"type": "text", "text": prompt}, *(self._image_part(encoded[i]) for i in missing)]
+            }]
+            try:
+                response = await self.client.chat.complete_async(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.0
+                )
+                content = response.choices[0].message.content
+                fenced = MARKDOWN_FENCE_RE.match(content)
+                analyses = orjson.loads(fenced.group(1) if fenced else content)
+                if not isinstance(analyses, list) or len(analyses) != len(missing):
+                    raise ValueError(f"Réponse Pixtral invalide: tableau de {len(missing)} analyses attendu")
+                for i, analysis in zip(missing, analyses):
+                    results[i] = self._page_result(analysis, page_nums[i])
+                    self._save_content_analysis(batch_keys[i], results[i])
+            except Exception as e:
+                pages = [page_nums[i] for i in missing]
+                print(f"Analyse groupée des pages {pages} impossible, analyse page par page: {e}")
+
+        # Page isolée ou repli après échec de la requête groupée
+        remaining = [i for i, result in enumerate(results) if result is None]
+        if remaining:
+            analyses = await asyncio.gather(*(
+                self.analyze_page_with_pixtral_async(images[i], page_nums[i]) for i in remaining
+            ))
+            for i, result in zip(remaining, analyses):
+                results[i] = result
+
+        return results
 
     def create_enriched_chunks(
         self,
@@ -223,7 +390,80 @@ Réponds UNIQUEMENT en JSON valide, sans markdown."""
         Returns:
             Liste de Documents LangChain avec métadonnées enrichies
         """
-        documents = []
+        # Colonnes normalisées une seule fois: textes, tableaux et visuels de toutes les pages
+        texts, tables, visuals = self._normalize_pages(page_analyses)
+
+        # 1. Chunks principaux: texte de chaque page
+        documents = [
+            Document(
+                page_content=main_text,
+                metadata={
+                    "source": pdf_path,
+                    "type": "pdf",
+                    "page": page_num,
+                    "processing": "pixtral_vision",
+                    "has_tables": has_tables,
+                    "has_visuals": has_visuals,
+                    "layout": layout,
+                    "chunk_type": "main_text"
+                }
+            )
+            for page_num, main_text, has_tables, has_visuals, layout in texts
+        ]
+
+        # 2. Chunks pour tableaux (avec descriptions enrichies)
+        documents.extend(
+            Document(
+                page_content=f"""TABLE {idx + 1} (Page {page_num}):
+Description: {description}
+Headers: {headers_str}
+Summary: {summary}""",
+                metadata={
+                    "source": pdf_path,
+                    "type": "pdf",
+                    "page": page_num,
+                    "processing": "pixtral_vision",
+                    "chunk_type": "table",
+                    "table_index": idx,
+                    "table_headers": headers
+                }
+            )
+            for page_num, idx, description, headers, headers_str, summary in tables
+        )
+
+        # 3. Chunks pour éléments visuels (descriptions générées par Pixtral)
+        documents.extend(
+            Document(
+                page_content=f"""VISUAL ELEMENT {idx + 1} (Page {page_num}):
+Type: {visual_type}
+Position: {visual_position}
+Description: {visual_description}""",
+                metadata={
+                    "source": pdf_path,
+                    "type": "pdf",
+                    "page": page_num,
+                    "processing": "pixtral_vision",
+                    "chunk_type": "visual",
+                    "visual_type": visual_type,
+                    "visual_index": idx
+                }
+            )
+            for page_num, idx, visual_type, visual_position, visual_description in visuals
+        )
+
+        return documents
+
+    @staticmethod
+    def _normalize_pages(
+        page_analyses: List[Dict[str, Any]]
+    ) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+        """
+        Normalise les analyses en trois colonnes, chaque champ converti en texte une seule fois:
+        - textes: (page, texte, has_tables, has_visuals, layout)
+        - tableaux: (page, index, description, headers, headers_str, summary)
+        - visuels: (page, index, type, position, description)
+        """
+        texts, tables, visuals = [], [], []
 
         for page_data in page_analyses:
             if not page_data["success"]:
@@ -236,7 +476,6 @@ Réponds UNIQUEMENT en JSON valide, sans markdown."""
             if not isinstance(analysis, dict):
                 continue
 
-            # 1. Chunk principal: texte de la page
             main_text = analysis.get("text_content", "")
 
             # Convertir en string si ce n'est pas déjà le cas
@@ -250,24 +489,19 @@ Réponds UNIQUEMENT en JSON valide, sans markdown."""
                 # Convertir en string
                 main_text = str(main_text)
 
-            if main_text.strip():
-                doc = Document(
-                    page_content=main_text,
-                    metadata={
-                        "source": pdf_path,
-                        "type": "pdf",
-                        "page": page_num,
-                        "processing": "pixtral_vision",
-                        "has_tables": len(analysis.get("tables", [])) > 0,
-                        "has_visuals": len(analysis.get("visual_elements", [])) > 0,
-                        "layout": analysis.get("document_structure", {}).get("layout_type", "unknown"),
-                        "chunk_type": "main_text"
-                    }
-                )
-                documents.append(doc)
+            page_tables = analysis.get("tables", [])
+            page_visuals = analysis.get("visual_elements", [])
 
-            # 2. Chunks pour tableaux (avec descriptions enrichies)
-            for idx, table in enumerate(analysis.get("tables", [])):
+            if main_text.strip():
+                texts.append((
+                    page_num,
+                    main_text,
+                    len(page_tables) > 0,
+                    len(page_visuals) > 0,
+                    analysis.get("document_structure", {}).get("layout_type", "unknown")
+                ))
+
+            for idx, table in enumerate(page_tables):
                 # Vérifier que table est bien un dict
                 if not isinstance(table, dict):
                     continue
@@ -277,66 +511,101 @@ Réponds UNIQUEMENT en JSON valide, sans markdown."""
                     headers_str = ', '.join(str(h) for h in headers)
                 else:
                     headers_str = str(headers)
-
-                # Convertir description et summary en strings
-                description = str(table.get('description', ''))
-                summary = str(table.get('data_summary', ''))
-
-                table_text = f"""TABLE {idx + 1} (Page {page_num}):
-Description: {description}
-Headers: {headers_str}
-Summary: {summary}"""
-
-                doc = Document(
-                    page_content=table_text,
-                    metadata={
-                        "source": pdf_path,
-                        "type": "pdf",
-                        "page": page_num,
-                        "processing": "pixtral_vision",
-                        "chunk_type": "table",
-                        "table_index": idx,
-                        "table_headers": headers if isinstance(headers, list) else []
-                    }
-                )
-                documents.append(doc)
-
-            # 3. Chunks pour éléments visuels (descriptions générées par Pixtral)
-            for idx, visual in enumerate(analysis.get("visual_elements", [])):
+                    headers = []
+
+                tables.append((
+                    page_num,
+                    idx,
+                    str(table.get('description', '')),
+                    headers,
+                    headers_str,
+                    str(table.get('data_summary', ''))
+                ))
+
+            for idx, visual in enumerate(page_visuals):
                 # Vérifier que visual est bien un dict
                 if not isinstance(visual, dict):
                     continue
 
-                # Convertir tous les champs en strings
-                visual_type = str(visual.get('type', 'unknown'))
-                visual_position = str(visual.get('position', 'unknown'))
-                visual_description = str(visual.get('description', ''))
+                visuals.append((
+                    page_num,
+                    idx,
+                    str(visual.get('type', 'unknown')),
+                    str(visual.get('position', 'unknown')),
+                    str(visual.get('description', ''))
+                ))
 
-                visual_text = f"""VISUAL ELEMENT {idx + 1} (Page {page_num}):
-Type: {visual_type}
-Position: {visual_position}
-Description: {visual_description}"""
-
-                doc = Document(
-                    page_content=visual_text,
-                    metadata={
-                        "source": pdf_path,
-                        "type": "pdf",
-                        "page": page_num,
-                        "processing": "pixtral_vision",
-                        "chunk_type": "visual",
-                        "visual_type": visual_type,
-                        "visual_index": idx
-                    }
-                )
-                documents.append(doc)
+        return texts, tables, visuals
 
-        return documents
+    def _content_cache_path(self, content_key: str) -> Path:
+        # Même image (autre fichier, page répétée) et même prompt: même analyse
+        return self.results_cache_dir / f"content_{self.model}_{content_key}.json"
+
+    def _load_content_analysis(self, content_key: str, page_num: int) -> Optional[Dict[str, Any]]:
+        """Analyse d'une image déjà vue, relue depuis le cache, ou None si absente."""
+        if not self.cache_results:
+            return None
+        try:
+            analysis = json.loads(self._content_cache_path(content_key).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return {"page_number": page_num, "analysis": analysis, "success": True, "error": None}
+
+    def _save_content_analysis(self, content_key: str, result: Dict[str, Any]) -> None:
+        """Écriture atomique de l'analyse réussie d'une image dans le cache."""
+        if not self.cache_results or not result["success"]:
+            return
+        cache_path = self._content_cache_path(content_key)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(result["analysis"], ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+
+    async def _analyze_pages(
+        self,
+        pdf_path: str,
+        dpi: int,
+        pending: List[int],
+        done: int,
+        total: int,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyse les pages demandées par groupes de pages_per_request (une requête
+        par groupe), au plus max_concurrency requêtes simultanées.
+        Chaque page est rastérisée juste avant son analyse: peu d'images en mémoire,
+        et la conversion des unes recouvre l'analyse des autres.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def analyze(batch):
+            nonlocal done
+            async with semaphore:
+                images = await asyncio.gather(*(
+                    asyncio.to_thread(self.convert_pdf_page, pdf_path, idx, dpi) for idx in batch
+                ))
+                analyses = await self.analyze_pages_batch_async(images, batch)
+
+            # Cache optionnel des images
+            if self.cache_images:
+                for idx, image in zip(batch, images):
+                    image.save(self.cache_dir / f"{Path(pdf_path).stem}_page_{idx}.png")
+
+            done += len(batch)
+            if progress_callback:
+                progress_callback(done, total)
+            return analyses
+
+        batches = [
+            pending[start:start + self.pages_per_request]
+            for start in range(0, len(pending), self.pages_per_request)
+        ]
+        batch_analyses = await asyncio.gather(*(analyze(batch) for batch in batches))
+        return [analysis for analyses in batch_analyses for analysis in analyses]
 
     def process_pdf_complete(
         self,
         pdf_path: str,
-        dpi: int = 200,
+        dpi: int = 150,
         progress_callback: Optional[Callable[[int, int], None]] = None
     ) -> List[Document]:
         """
@@ -344,28 +613,19 @@ Description: {visual_description}"""
 
         Args:
             pdf_path: Chemin du fichier PDF
-            dpi: Résolution pour conversion (200 = performance, 300 = qualité)
+            dpi: Résolution pour conversion (150 = pages de texte, 300 = qualité)
             progress_callback: Fonction appelée pour chaque page (optionnel)
 
         Returns:
             Liste de Documents enrichis prêts pour Qdrant
         """
-        # 1. Conversion PDF -> Images
-        images = self.convert_pdf_to_images(pdf_path, dpi=dpi)
+        n_pages = pdfinfo_from_path(pdf_path)["Pages"]
 
-        # 2. Analyse de chaque page avec Pixtral
-        page_analyses = []
-        for idx, image in enumerate(images):
-            if progress_callback:
-                progress_callback(idx + 1, len(images))
-
-            analysis = self.analyze_page_with_pixtral(image, idx)
-            page_analyses.append(analysis)
-
-            # Cache optionnel des images
-            if self.cache_images:
-                cache_path = self.cache_dir / f"{Path(pdf_path).stem}_page_{idx}.png"
-                image.save(cache_path)
+        # 1-2. Conversion PDF -> Image et analyse Pixtral, page par page et en parallèle;
+        # une page déjà analysée (même image, même prompt) est relue depuis le cache
+        page_analyses = asyncio.run(self._analyze_pages(
+            pdf_path, dpi, list(range(n_pages)), 0, n_pages, progress_callback
+        ))
 
         # 3. Création de chunks enrichis
         documents = self.create_enriched_chunks(page_analyses, pdf_path)